@@ -0,0 +1,292 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Optional
+
+log = logging.getLogger("red.videodownloader.cache")
+
+HASH_CHUNK_SIZE = 1024 * 1024
+INDEX_FILE = "index.json"
+
+
+def _hash_file(path: str) -> tuple[str, int]:
+    """Return (sha256 hex digest, size in bytes) of a file."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def _remove_unlisted(root: Path, keep: set[str]) -> int:
+    """Delete files in the cache folder that no index entry names. Returns how many."""
+    removed = 0
+    for path in root.iterdir():
+        if path.name in keep or not path.is_file():
+            continue
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def _move_into(src: str, dest: Path):
+    """Move a download into the cache, or drop it if the blob already exists."""
+    if dest.exists():
+        os.remove(src)
+    else:
+        shutil.move(src, dest)
+
+
+class CacheEntry:
+    """One cached URL. Several entries may share a blob with the same digest."""
+
+    __slots__ = ("digest", "ext", "title", "filename", "size", "created", "last_used")
+
+    def __init__(
+        self,
+        digest: str,
+        ext: str,
+        title: str,
+        filename: str,
+        size: int,
+        created: float,
+        last_used: float,
+    ):
+        self.digest = digest
+        self.ext = ext
+        self.title = title
+        self.filename = filename
+        self.size = size
+        self.created = created
+        self.last_used = last_used
+
+    def to_dict(self) -> dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CacheEntry":
+        return cls(**{slot: data[slot] for slot in cls.__slots__})
+
+
+class MediaCache:
+    """Disk cache of downloaded videos keyed by canonical URL.
+
+    Files are stored once per content hash, so the same video reached through
+    different links only takes up space once. Entries expire after ``ttl``
+    seconds and the least recently used ones are evicted when the total size
+    goes over ``max_bytes``.
+
+    Blobs that are about to be uploaded are pinned; eviction skips their
+    entries, and a pinned blob whose entry is dropped anyway (e.g. by
+    ``clear``) is only deleted once the last pin is released.
+    """
+
+    def __init__(self, root: Path, max_bytes: int, ttl: float):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._save_lock = asyncio.Lock()
+        self._pins: Counter = Counter()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    # ── Introspection ──
+
+    def blob_path(self, entry: CacheEntry) -> Path:
+        return self.root / f"{entry.digest}{entry.ext}"
+
+    @property
+    def total_bytes(self) -> int:
+        return sum({e.digest: e.size for e in self._entries.values()}.values())
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "blobs": len({e.digest for e in self._entries.values()}),
+            "total_bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+        }
+
+    # ── Persistence ──
+
+    async def load(self):
+        """Read the index from disk, dropping entries whose files are gone.
+
+        Blobs no entry refers to, left behind by a crash or an older version,
+        are deleted.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        index_path = self.root / INDEX_FILE
+        try:
+            raw = await asyncio.to_thread(index_path.read_text, encoding="utf-8")
+            data = json.loads(raw)
+        except FileNotFoundError:
+            data = {}
+        except (OSError, ValueError) as e:
+            log.warning("Discarding unreadable cache index: %s", e)
+            data = {}
+
+        entries = []
+        for key, value in data.items():
+            try:
+                entries.append((key, CacheEntry.from_dict(value)))
+            except (KeyError, TypeError):
+                continue
+        entries.sort(key=lambda item: item[1].last_used)
+        self._entries = OrderedDict(
+            (key, entry) for key, entry in entries if self.blob_path(entry).exists()
+        )
+        keep = {INDEX_FILE} | {self.blob_path(e).name for e in self._entries.values()}
+        removed = await asyncio.to_thread(_remove_unlisted, self.root, keep)
+        if removed:
+            log.info("Removed %d unindexed cache files", removed)
+        await self._evict()
+        await self._save()
+
+    async def _save(self):
+        snapshot = {key: entry.to_dict() for key, entry in self._entries.items()}
+        async with self._save_lock:
+            await asyncio.to_thread(self._write_index, snapshot)
+
+    def _write_index(self, snapshot: dict):
+        tmp_path = self.root / f"{INDEX_FILE}.tmp"
+        tmp_path.write_text(json.dumps(snapshot), encoding="utf-8")
+        os.replace(tmp_path, self.root / INDEX_FILE)
+
+    # ── Lookups ──
+
+    def _expired(self, entry: CacheEntry, now: float) -> bool:
+        return self.ttl > 0 and now - entry.created > self.ttl
+
+    def get(
+        self, key: str, max_size: Optional[int] = None, count: bool = True
+    ) -> Optional[CacheEntry]:
+        """Return the live entry for ``key``, counting the lookup as a hit or miss.
+
+        Entries larger than ``max_size`` are treated as misses but kept.
+        """
+        entry = self._entries.get(key)
+        now = time.time()
+        if entry is not None and (
+            self._expired(entry, now) or not self.blob_path(entry).exists()
+        ):
+            self._drop(key)
+            entry = None
+        if entry is None or (max_size is not None and entry.size > max_size):
+            if count:
+                self.misses += 1
+            return None
+
+        entry.last_used = now
+        self._entries.move_to_end(key)
+        if count:
+            self.hits += 1
+            self.bytes_saved += entry.size
+        return entry
+
+    async def put(self, key: str, path: str, title: str) -> CacheEntry:
+        """Move a finished download into the cache and index it under ``key``.
+
+        ``path`` no longer exists afterwards; use ``blob_path`` on the returned
+        entry to read the file.
+        """
+        digest, size = await asyncio.to_thread(_hash_file, path)
+        ext = Path(path).suffix
+        await asyncio.to_thread(_move_into, path, self.root / f"{digest}{ext}")
+
+        now = time.time()
+        entry = CacheEntry(digest, ext, title, Path(path).name, size, now, now)
+        old = self._entries.get(key)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if old is not None and old.digest != digest:
+            self._remove_orphan(old.digest)
+        await self._evict(protect=key)
+        await self._save()
+        return entry
+
+    # ── Pinning ──
+
+    def pin(self, digest: str) -> str:
+        """Keep a blob on disk until ``unpin``. Returns the digest for convenience."""
+        self._pins[digest] += 1
+        return digest
+
+    def unpin(self, digest: str):
+        self._pins[digest] -= 1
+        if self._pins[digest] > 0:
+            return
+        del self._pins[digest]
+        self._remove_orphan(digest)
+
+    def _remove_orphan(self, digest: str):
+        """Delete a blob nothing refers to any more."""
+        if digest in self._pins:
+            return
+        if any(e.digest == digest for e in self._entries.values()):
+            return
+        for path in self.root.glob(f"{digest}*"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    # ── Eviction ──
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._remove_orphan(entry.digest)
+
+    async def _evict(self, protect: Optional[str] = None):
+        """Drop expired entries, then least recently used ones until under the size cap.
+
+        Entries whose blob is pinned are kept, even if that leaves the cache
+        over its cap until they are released.
+        """
+        now = time.time()
+        for key, entry in list(self._entries.items()):
+            if self._evictable(key, entry, protect) and self._expired(entry, now):
+                self._drop(key)
+
+        for key, entry in list(self._entries.items()):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if self._evictable(key, entry, protect):
+                self._drop(key)
+
+    def _evictable(self, key: str, entry: CacheEntry, protect: Optional[str]) -> bool:
+        return key != protect and entry.digest not in self._pins
+
+    async def configure(self, max_bytes: Optional[int] = None, ttl: Optional[float] = None):
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        if ttl is not None:
+            self.ttl = ttl
+        await self._evict()
+        await self._save()
+
+    async def clear(self):
+        for key in list(self._entries):
+            self._drop(key)
+        self.hits = self.misses = self.bytes_saved = 0
+        await self._save()
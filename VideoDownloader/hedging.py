@@ -0,0 +1,139 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+# Never hedge sooner than this, however fast the primary usually is
+MIN_HEDGE_DELAY = 2.0
+# Samples needed before the delay adapts to observed latencies
+MIN_SAMPLES = 10
+# Primaries that succeed less often than this get hedged right away
+MIN_SUCCESS_RATE = 0.5
+
+
+def _percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class StrategyStats:
+    __slots__ = ("successes", "failures", "wins", "latencies")
+
+    def __init__(self):
+        self.successes = 0
+        self.failures = 0
+        self.wins = 0
+        self.latencies: deque[float] = deque(maxlen=100)
+
+    @property
+    def attempts(self) -> int:
+        return self.successes + self.failures
+
+    @property
+    def success_rate(self) -> float:
+        return self.successes / self.attempts if self.attempts else 0.0
+
+    def latency(self, pct: float) -> Optional[float]:
+        return _percentile(self.latencies, pct) if self.latencies else None
+
+
+class StrategyTracker:
+    """Success rates and latencies per download strategy, used to tune hedging."""
+
+    def __init__(self):
+        self.strategies: dict[str, StrategyStats] = {}
+
+    def get(self, name: str) -> StrategyStats:
+        return self.strategies.setdefault(name, StrategyStats())
+
+    async def timed(self, name: str, coro: Awaitable):
+        """Await ``coro``, recording how long it took and whether it worked."""
+        stats = self.get(name)
+        start = time.monotonic()
+        try:
+            result = await coro
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            stats.failures += 1
+            raise
+        stats.successes += 1
+        stats.latencies.append(time.monotonic() - start)
+        return result
+
+    def hedge_delay(self, name: str, configured: float) -> float:
+        """How long to give strategy ``name`` before starting a backup.
+
+        Starts at the configured delay and tightens to just above the
+        primary's p90 latency once there are enough samples. An unreliable
+        primary gets hedged almost immediately.
+        """
+        stats = self.get(name)
+        if stats.attempts < MIN_SAMPLES:
+            return configured
+        if stats.success_rate < MIN_SUCCESS_RATE:
+            return min(configured, MIN_HEDGE_DELAY)
+        p90 = stats.latency(90)
+        if p90 is None:
+            return configured
+        return max(MIN_HEDGE_DELAY, min(configured, p90 * 1.2))
+
+
+def _discard_result(task: asyncio.Task):
+    """Remove the file a losing strategy may have finished downloading."""
+    if task.cancelled() or task.exception() is not None:
+        return
+    try:
+        os.remove(task.result()[0])
+    except (OSError, TypeError, IndexError):
+        pass
+
+
+async def hedged(
+    primary: Callable[[], Awaitable],
+    fallback: Callable[[], Awaitable],
+    delay: float,
+    fatal: tuple = (),
+):
+    """Race two strategies, starting ``fallback`` only if ``primary`` is slow or fails.
+
+    Returns ``(winner_index, result)``. The loser is cancelled, and if it
+    produced a file anyway that file is deleted. Exceptions listed in
+    ``fatal`` end the race immediately; otherwise the last error is raised
+    when both strategies fail.
+    """
+    tasks = [asyncio.ensure_future(primary())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        last_error: Optional[BaseException] = None
+        if done:
+            last_error = tasks[0].exception()
+            if last_error is None:
+                return 0, tasks[0].result()
+            if isinstance(last_error, fatal):
+                raise last_error
+
+        tasks.append(asyncio.ensure_future(fallback()))
+        pending = {task for task in tasks if not task.done()}
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                error = task.exception()
+                if error is None:
+                    for other in tasks:
+                        if other is not task:
+                            other.cancel()
+                            other.add_done_callback(_discard_result)
+                    return tasks.index(task), task.result()
+                if isinstance(error, fatal):
+                    raise error
+                last_error = error
+        raise last_error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+log = logging.getLogger("red.videodownloader.queue")
+
+
+class QueueFullError(Exception):
+    """Raised when a job is rejected because the queue is at capacity."""
+
+    def __init__(self, scope: str):
+        self.scope = scope
+        super().__init__(f"Download queue is full ({scope})")
+
+
+class Job:
+    """A queued download. ``factory`` is only called once the job starts.
+
+    ``result`` resolves to whatever the factory's coroutine returns or raises.
+    """
+
+    __slots__ = ("guild_id", "factory", "enqueued_at", "started_at", "task", "result")
+
+    def __init__(self, guild_id: int, factory: Callable[[], Awaitable]):
+        self.guild_id = guild_id
+        self.factory = factory
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self.result: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    @property
+    def wait(self) -> float:
+        """Seconds spent queued (so far, if the job hasn't started yet)."""
+        end = self.started_at if self.started_at is not None else time.monotonic()
+        return end - self.enqueued_at
+
+
+class DownloadQueue:
+    """Bounded job queue with a global concurrency limit and per-guild fairness.
+
+    Pending jobs are kept per guild and started round-robin, so one guild
+    spamming links can only ever occupy ``per_guild`` of the ``concurrency``
+    worker slots while other guilds still get served in turn.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 3,
+        per_guild: int = 1,
+        max_pending: int = 30,
+        max_pending_per_guild: int = 10,
+    ):
+        self.concurrency = concurrency
+        self.per_guild = per_guild
+        self.max_pending = max_pending
+        self.max_pending_per_guild = max_pending_per_guild
+
+        self._pending: dict[int, deque[Job]] = {}
+        self._rotation: deque[int] = deque()
+        self._running: dict[int, int] = {}
+        self._active: set[Job] = set()
+        self._waits: deque[float] = deque(maxlen=200)
+        self.completed = 0
+        self.rejected = 0
+
+    # ── Introspection ──
+
+    @property
+    def depth(self) -> int:
+        return sum(len(jobs) for jobs in self._pending.values())
+
+    @property
+    def running(self) -> int:
+        return len(self._active)
+
+    def guild_depth(self, guild_id: int) -> int:
+        return len(self._pending.get(guild_id, ()))
+
+    def stats(self) -> dict:
+        waits = list(self._waits)
+        pending_waits = [job.wait for jobs in self._pending.values() for job in jobs]
+        return {
+            "depth": self.depth,
+            "running": self.running,
+            "concurrency": self.concurrency,
+            "per_guild": self.per_guild,
+            "max_pending": self.max_pending,
+            "max_pending_per_guild": self.max_pending_per_guild,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait": sum(waits) / len(waits) if waits else 0.0,
+            "max_wait": max(waits, default=0.0),
+            "oldest_pending": max(pending_waits, default=0.0),
+        }
+
+    # ── Scheduling ──
+
+    def submit(self, guild_id: int, factory: Callable[[], Awaitable]) -> Job:
+        """Queue a job, raising ``QueueFullError`` if there is no room for it."""
+        if self.depth >= self.max_pending:
+            self.rejected += 1
+            raise QueueFullError("global")
+        if self.guild_depth(guild_id) >= self.max_pending_per_guild:
+            self.rejected += 1
+            raise QueueFullError("guild")
+
+        job = Job(guild_id, factory)
+        jobs = self._pending.setdefault(guild_id, deque())
+        if not jobs and guild_id not in self._rotation:
+            self._rotation.append(guild_id)
+        jobs.append(job)
+        self._pump()
+        return job
+
+    def _pump(self):
+        """Start as many pending jobs as the limits allow, round-robin by guild."""
+        skipped = 0
+        while len(self._active) < self.concurrency and skipped < len(self._rotation):
+            guild_id = self._rotation[0]
+            self._rotation.rotate(-1)
+            if self._running.get(guild_id, 0) >= self.per_guild:
+                skipped += 1
+                continue
+            skipped = 0
+
+            jobs = self._pending[guild_id]
+            job = jobs.popleft()
+            if not jobs:
+                del self._pending[guild_id]
+                self._rotation.remove(guild_id)
+            self._start(job)
+
+    def _start(self, job: Job):
+        job.started_at = time.monotonic()
+        self._waits.append(job.wait)
+        self._running[job.guild_id] = self._running.get(job.guild_id, 0) + 1
+        self._active.add(job)
+        job.task = asyncio.create_task(self._run(job))
+
+    async def _run(self, job: Job):
+        try:
+            result = await job.factory()
+        except asyncio.CancelledError:
+            job.result.cancel()
+            raise
+        except Exception as e:
+            if not job.result.done():
+                job.result.set_exception(e)
+            else:
+                log.exception("Download job for guild %s failed", job.guild_id)
+        else:
+            if not job.result.done():
+                job.result.set_result(result)
+        finally:
+            self._active.discard(job)
+            remaining = self._running.get(job.guild_id, 1) - 1
+            if remaining:
+                self._running[job.guild_id] = remaining
+            else:
+                self._running.pop(job.guild_id, None)
+            self.completed += 1
+            self._pump()
+
+    def configure(
+        self,
+        concurrency: Optional[int] = None,
+        per_guild: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        max_pending_per_guild: Optional[int] = None,
+    ):
+        """Change limits on the fly; raising a limit starts waiting jobs immediately."""
+        if concurrency is not None:
+            self.concurrency = concurrency
+        if per_guild is not None:
+            self.per_guild = per_guild
+        if max_pending is not None:
+            self.max_pending = max_pending
+        if max_pending_per_guild is not None:
+            self.max_pending_per_guild = max_pending_per_guild
+        self._pump()
+
+    def close(self):
+        """Drop pending jobs and cancel running ones."""
+        for jobs in self._pending.values():
+            for job in jobs:
+                job.result.cancel()
+        self._pending.clear()
+        self._rotation.clear()
+        for job in list(self._active):
+            if job.task is not None:
+                job.task.cancel()
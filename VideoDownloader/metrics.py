@@ -0,0 +1,62 @@
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+# Samples kept per stage / strategy for percentiles
+WINDOW = 200
+
+
+def _percentile(samples, pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class PipelineMetrics:
+    """Per-stage timings, download throughput and outcome counters for the download pipeline."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.stages: dict[str, deque[float]] = {}
+        self.throughput: dict[str, deque[float]] = {}
+        self.outcomes: dict[str, Counter] = {}
+        self.errors: Counter = Counter()
+
+    def record_stage(self, stage: str, seconds: float):
+        self.stages.setdefault(stage, deque(maxlen=WINDOW)).append(seconds)
+
+    @asynccontextmanager
+    async def time(self, stage: str):
+        """Record how long the block takes under ``stage``, whether or not it succeeds."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record_stage(stage, time.monotonic() - start)
+
+    def record_download(self, strategy: str, size: int, seconds: float):
+        if seconds > 0:
+            self.throughput.setdefault(strategy, deque(maxlen=WINDOW)).append(
+                size / seconds
+            )
+
+    def record_outcome(self, platform: str, category: Optional[str] = None):
+        """Count a finished link as a success, or as a failure of the given category."""
+        self.outcomes.setdefault(platform, Counter())[category or "ok"] += 1
+        if category:
+            self.errors[category] += 1
+
+    def stage_summary(self, stage: str) -> tuple[int, Optional[float], Optional[float]]:
+        """(samples, p50, p95) for a stage."""
+        samples = self.stages.get(stage, ())
+        return len(samples), _percentile(samples, 50), _percentile(samples, 95)
+
+    def throughput_summary(self, strategy: str) -> Optional[float]:
+        """Median bytes per second for a strategy."""
+        return _percentile(self.throughput.get(strategy, ()), 50)
+
+    def reset(self):
+        self.__init__()
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+log = logging.getLogger("red.videodownloader.scratch")
+
+# How often a job waiting on the quota re-checks disk usage
+QUOTA_RECHECK_INTERVAL = 5
+# Longest a job waits for quota before giving up
+QUOTA_WAIT_TIMEOUT = 300
+
+
+class ScratchFullError(OSError):
+    """The scratch quota stayed used up for longer than a job may wait."""
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+class ScratchSpace:
+    """Per-job working directories under one root, with a shared disk quota.
+
+    Every download gets its own directory from ``acquire`` and all of it,
+    including partial fragments and failed leftovers, is deleted by
+    ``release``. Anything still in the root at startup is an orphan from a
+    previous run and is removed by ``sweep``. While downloads in progress hold
+    more than ``quota_bytes``, ``acquire`` waits for space to be freed.
+
+    Only jobs still downloading count against the quota: a job marked with
+    ``settle`` keeps its files until release but no longer blocks new jobs,
+    since its owner may itself be waiting on jobs that need the space.
+    """
+
+    def __init__(self, root: Path, quota_bytes: int):
+        self.root = Path(root)
+        self.quota_bytes = quota_bytes
+        self._freed = asyncio.Condition()
+        self.jobs: set[Path] = set()
+        self._settled: set[Path] = set()
+        self.waiting = 0
+
+    async def usage(self) -> int:
+        return await asyncio.to_thread(_dir_size, self.root)
+
+    async def active_usage(self) -> int:
+        """Bytes held by jobs that are still downloading."""
+        active = [path for path in self.jobs if path not in self._settled]
+        return await asyncio.to_thread(lambda: sum(map(_dir_size, active)))
+
+    async def sweep(self) -> int:
+        """Delete every leftover job directory. Returns the bytes freed."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        freed = await self.usage()
+        for child in self.root.iterdir():
+            if child in self.jobs:
+                continue
+            await asyncio.to_thread(self._remove, child)
+        if freed:
+            log.info("Removed %d bytes of orphaned scratch files", freed)
+        return freed
+
+    async def acquire(self, timeout: float = QUOTA_WAIT_TIMEOUT) -> Path:
+        """Create a fresh job directory, waiting up to ``timeout`` while the quota is used up."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        self.waiting += 1
+        try:
+            async with self._freed:
+                while await self.active_usage() >= self.quota_bytes:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        raise ScratchFullError(
+                            f"Scratch space stayed full for {timeout:.0f}s"
+                        )
+                    try:
+                        await asyncio.wait_for(
+                            self._freed.wait(), min(remaining, QUOTA_RECHECK_INTERVAL)
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            self.waiting -= 1
+
+        path = self.root / uuid.uuid4().hex
+        path.mkdir(parents=True)
+        self.jobs.add(path)
+        return path
+
+    async def settle(self, path: Path):
+        """Stop counting a finished job against the quota; its files stay until release."""
+        if path in self.jobs:
+            self._settled.add(path)
+            async with self._freed:
+                self._freed.notify_all()
+
+    async def release(self, path: Path):
+        """Delete a job directory and everything in it."""
+        self.jobs.discard(path)
+        self._settled.discard(path)
+        await asyncio.to_thread(self._remove, path)
+        async with self._freed:
+            self._freed.notify_all()
+
+    @staticmethod
+    def _remove(path: Path):
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
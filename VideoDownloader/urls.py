@@ -0,0 +1,113 @@
+import asyncio
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import aiohttp
+
+# Hosts that serve the same media under different names
+HOST_ALIASES = {
+    "x.com": "twitter.com",
+    "mobile.twitter.com": "twitter.com",
+    "m.tiktok.com": "tiktok.com",
+}
+
+# Share/referral parameters that don't change which media a link points at
+TRACKING_PARAMS = {
+    "igsh",
+    "igshid",
+    "ref",
+    "ref_src",
+    "ref_url",
+    "s",
+    "t",
+    "si",
+    "_r",
+    "_t",
+    "is_from_webapp",
+    "is_copy_url",
+    "sender_device",
+    "sender_web_id",
+    "share_app_id",
+    "share_link_id",
+    "social_sharing",
+    "u_code",
+    "web_id",
+    "checksum",
+    "lang",
+}
+
+# Redirecting short-link hosts and path prefixes
+SHORT_LINK_HOSTS = {"vm.tiktok.com", "vt.tiktok.com"}
+SHORT_LINK_PREFIXES = {"tiktok.com": "/t/"}
+
+MAX_EXPANSIONS_CACHED = 1024
+
+
+def _is_tracking(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith("utm_")
+
+
+def canonical_url(url: str) -> str:
+    """Normalise a media link so the same post always maps to the same key.
+
+    Lowercases the host, drops ``www.``/``m.`` prefixes and known aliases,
+    strips tracking parameters, the fragment and the trailing slash, and
+    sorts whatever query parameters are left.
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower().split("@")[-1].split(":")[0]
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix) :]
+    host = HOST_ALIASES.get(host, host)
+    path = parts.path.rstrip("/") or "/"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking(k)
+    )
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+
+def is_short_link(url: str) -> bool:
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if host in SHORT_LINK_HOSTS:
+        return True
+    prefix = SHORT_LINK_PREFIXES.get(host)
+    return prefix is not None and parts.path.startswith(prefix)
+
+
+class ShortLinkResolver:
+    """Expands redirecting short links, remembering recent answers."""
+
+    def __init__(self, maxsize: int = MAX_EXPANSIONS_CACHED):
+        self.maxsize = maxsize
+        self._resolved: OrderedDict[str, str] = OrderedDict()
+
+    async def resolve(self, session: aiohttp.ClientSession, url: str) -> str:
+        """Return the link a short URL redirects to, or ``url`` if it can't be expanded."""
+        if not is_short_link(url):
+            return url
+        key = canonical_url(url)
+        if key in self._resolved:
+            self._resolved.move_to_end(key)
+            return self._resolved[key]
+
+        try:
+            async with session.head(
+                url,
+                allow_redirects=True,
+                headers={"User-Agent": "Mozilla/5.0"},
+                timeout=aiohttp.ClientTimeout(total=10),
+            ) as resp:
+                expanded = str(resp.url)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return url
+
+        self._resolved[key] = expanded
+        if len(self._resolved) > self.maxsize:
+            self._resolved.popitem(last=False)
+        return expanded
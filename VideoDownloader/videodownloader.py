@@ -1,13 +1,28 @@
 import discord
 from redbot.core import commands, Config
 from redbot.core.bot import Red
-import yt_dlp
+from redbot.core.data_manager import cog_data_path
+from redbot.core.errors import CogLoadError
+import importlib.util
 import os
 import re
-import tempfile
+import shutil
+import sys
+import time
 import asyncio
 import aiohttp
+import logging
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Optional
+
+from .cache import MediaCache
+from .hedging import StrategyTracker, hedged
+from .jobqueue import DownloadQueue, QueueFullError
+from .metrics import PipelineMetrics
+from .scratch import ScratchSpace
+from .urls import ShortLinkResolver, canonical_url
+from .workers import ProcessPool, WorkerError, WorkerTimeoutError
 
 # Regex to detect Instagram, Twitter/X, and TikTok links
 LINK_PATTERN = re.compile(
@@ -15,8 +30,30 @@ LINK_PATTERN = re.compile(
     re.IGNORECASE,
 )
 
+log = logging.getLogger("red.videodownloader")
+
 TIKWM_API = "https://www.tikwm.com/api/"
 
+# Discord allows at most 10 attachments per message
+MAX_ATTACHMENTS = 10
+MAX_LINKS_PER_MESSAGE = 10
+
+# Size of each read when streaming a video response to disk
+CHUNK_SIZE = 64 * 1024
+
+# Connection pool tuning for the shared HTTP session
+HTTP_POOL_LIMIT = 20
+HTTP_POOL_LIMIT_PER_HOST = 8
+HTTP_KEEPALIVE_TIMEOUT = 60
+HTTP_DNS_CACHE_TTL = 300
+
+# Transcode-to-fit: largest original we'll fetch to shrink, and encoder limits
+TRANSCODE_SOURCE_MAX_MB = 200
+TRANSCODE_AUDIO_KBPS = 96
+TRANSCODE_MIN_VIDEO_KBPS = 150
+FFMPEG_WORKERS = 1
+FFMPEG_TIMEOUT = 300
+
 
 class VideoDownloader(commands.Cog):
     """Auto-downloads and reposts videos from Instagram, Twitter/X, and TikTok links."""
@@ -31,14 +68,121 @@ class VideoDownloader(commands.Cog):
             "enabled": True,
             "max_filesize_mb": 25,
             "delete_original_message": False,
+            "transcode_oversized": False,
         }
         default_global = {
             "ffmpeg_location": "",
             "rapidapi_key": "",
             "cookies_file": "",
+            "max_concurrent_downloads": 3,
+            "max_downloads_per_guild": 1,
+            "max_queued_downloads": 30,
+            # Enough for every link in one message to be accepted
+            "max_queued_per_guild": MAX_LINKS_PER_MESSAGE,
+            "cache_enabled": True,
+            "cache_max_mb": 1024,
+            "cache_ttl_hours": 24,
+            "ytdlp_workers": 2,
+            "ytdlp_timeout": 180,
+            "hedge_delay": 8.0,
+            "scratch_quota_mb": 2048,
         }
         self.config.register_guild(**default_guild)
         self.config.register_global(**default_global)
+        self.queue = DownloadQueue()
+        self.session: aiohttp.ClientSession = None
+        self.resolver = ShortLinkResolver()
+        self.ytdlp_pool = ProcessPool("yt-dlp")
+        self.ffmpeg_pool = ProcessPool(
+            "ffmpeg", max_workers=FFMPEG_WORKERS, timeout=FFMPEG_TIMEOUT
+        )
+        self.strategies = StrategyTracker()
+        self.metrics = PipelineMetrics()
+        self.scratch = ScratchSpace(
+            cog_data_path(self) / "scratch",
+            quota_bytes=default_global["scratch_quota_mb"] * 1024 * 1024,
+        )
+        # Downloads in progress, keyed by (canonical URL, size limit, transcode)
+        self._inflight: dict[tuple[str, int, bool], _Flight] = {}
+        self._batches: set[asyncio.Task] = set()
+        # Settings for the on_message hot path, dropped after any vdl command
+        self._guild_cache: dict[int, dict] = {}
+        self._global_cache: Optional[dict] = None
+        self.cache = MediaCache(
+            cog_data_path(self) / "cache",
+            max_bytes=default_global["cache_max_mb"] * 1024 * 1024,
+            ttl=default_global["cache_ttl_hours"] * 3600,
+        )
+
+    async def cog_load(self):
+        if importlib.util.find_spec("yt_dlp") is None:
+            raise CogLoadError(
+                "yt-dlp is not installed for this bot's Python. "
+                "Install it with `pip install yt-dlp` and load the cog again."
+            )
+        # yt-dlp runs as `python -m yt_dlp`; Downloader installs cog requirements
+        # into a lib folder only the bot process has on sys.path, so hand the
+        # workers the same path
+        self.ytdlp_pool.env = {
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(p for p in sys.path if p),
+        }
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=HTTP_POOL_LIMIT,
+                limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+                enable_cleanup_closed=True,
+            ),
+        )
+        global_cfg = await self.config.all()
+        self.queue.configure(
+            concurrency=global_cfg["max_concurrent_downloads"],
+            per_guild=global_cfg["max_downloads_per_guild"],
+            max_pending=global_cfg["max_queued_downloads"],
+            max_pending_per_guild=global_cfg["max_queued_per_guild"],
+        )
+        self.cache.max_bytes = global_cfg["cache_max_mb"] * 1024 * 1024
+        self.cache.ttl = global_cfg["cache_ttl_hours"] * 3600
+        await self.cache.load()
+        self.scratch.quota_bytes = global_cfg["scratch_quota_mb"] * 1024 * 1024
+        await self.scratch.sweep()
+        self.ytdlp_pool.configure(
+            max_workers=global_cfg["ytdlp_workers"],
+            timeout=global_cfg["ytdlp_timeout"],
+        )
+
+    async def cog_after_invoke(self, ctx: commands.Context):
+        # Every command in this cog may have changed settings
+        if ctx.guild is not None:
+            self._guild_cache.pop(ctx.guild.id, None)
+        self._global_cache = None
+
+    async def _guild_settings(self, guild: discord.Guild) -> dict:
+        """A guild's settings, read from Config once and kept until a vdl command runs."""
+        cfg = self._guild_cache.get(guild.id)
+        if cfg is None:
+            cfg = await self.config.guild(guild).all()
+            cfg["watched"] = frozenset(cfg["enabled_channels"])
+            self._guild_cache[guild.id] = cfg
+        return cfg
+
+    async def _global_settings(self) -> dict:
+        if self._global_cache is None:
+            self._global_cache = await self.config.all()
+        return self._global_cache
+
+    async def cog_unload(self):
+        self.queue.close()
+        for task in list(self._batches):
+            task.cancel()
+        for flight in list(self._inflight.values()):
+            flight.task.cancel()
+        self.ytdlp_pool.close()
+        self.ffmpeg_pool.close()
+        if self.session is not None:
+            await self.session.close()
 
     # ──────────────────────────────────────────────
     # Admin commands
@@ -106,6 +250,25 @@ class VideoDownloader(commands.Cog):
         await self.config.guild(ctx.guild).max_filesize_mb.set(mb)
         await ctx.send(f"✅ Max file size set to **{mb} MB**.")
 
+    @vdl.command(name="transcode")
+    async def vdl_transcode(self, ctx: commands.Context):
+        """Toggle shrinking videos over the size limit with ffmpeg instead of rejecting them."""
+        current = await self.config.guild(ctx.guild).transcode_oversized()
+        if not current:
+            ffmpeg_location = await self.config.ffmpeg_location()
+            if not self._find_binary("ffmpeg", ffmpeg_location) or not self._find_binary(
+                "ffprobe", ffmpeg_location
+            ):
+                return await ctx.send(
+                    "❌ ffmpeg and ffprobe are needed for this. Ask the bot owner to install "
+                    "them or set `[p]vdl setffmpeg`."
+                )
+        await self.config.guild(ctx.guild).transcode_oversized.set(not current)
+        state = "will" if not current else "will not"
+        await ctx.send(
+            f"✅ Videos over the size limit **{state}** be re-encoded to fit."
+        )
+
     @vdl.command(name="settings")
     async def vdl_settings(self, ctx: commands.Context):
         """Show current settings."""
@@ -129,6 +292,11 @@ class VideoDownloader(commands.Cog):
             value="✅ Yes" if cfg["delete_original_message"] else "❌ No",
             inline=True,
         )
+        embed.add_field(
+            name="Transcode Oversized",
+            value="✅ Yes" if cfg["transcode_oversized"] else "❌ No",
+            inline=True,
+        )
         embed.add_field(name="Watched Channels", value=ch_str, inline=False)
         embed.add_field(
             name="Instagram Method",
@@ -197,6 +365,323 @@ class VideoDownloader(commands.Cog):
         await self.config.cookies_file.set("")
         await ctx.send("✅ Cookies file cleared.")
 
+    @vdl.group(name="cache", invoke_without_command=True)
+    async def vdl_cache(self, ctx: commands.Context):
+        """Show repost cache usage, hit rate and bytes saved."""
+        stats = self.cache.stats()
+        global_cfg = await self.config.all()
+        embed = discord.Embed(
+            title="Video Downloader Cache", color=discord.Color.blurple()
+        )
+        embed.add_field(
+            name="Enabled",
+            value="✅ Yes" if global_cfg["cache_enabled"] else "❌ No",
+            inline=True,
+        )
+        embed.add_field(
+            name="Size",
+            value=(
+                f"{stats['total_bytes'] / 1024 / 1024:.1f} / "
+                f"{stats['max_bytes'] / 1024 / 1024:.0f} MB"
+            ),
+            inline=True,
+        )
+        embed.add_field(
+            name="Entries",
+            value=f"{stats['entries']} links · {stats['blobs']} files",
+            inline=True,
+        )
+        embed.add_field(
+            name="Hit Rate",
+            value=(
+                f"{stats['hit_rate']:.0%} ({stats['hits']} hits / "
+                f"{stats['misses']} misses)"
+            ),
+            inline=True,
+        )
+        embed.add_field(
+            name="Bytes Saved",
+            value=f"{stats['bytes_saved'] / 1024 / 1024:.1f} MB",
+            inline=True,
+        )
+        embed.add_field(
+            name="Expiry", value=f"{stats['ttl'] / 3600:g} hours", inline=True
+        )
+        await ctx.send(embed=embed)
+
+    @vdl_cache.command(name="toggle")
+    @commands.is_owner()
+    async def vdl_cache_toggle(self, ctx: commands.Context):
+        """(Bot owner only) Enable or disable the repost cache."""
+        current = await self.config.cache_enabled()
+        await self.config.cache_enabled.set(not current)
+        state = "enabled" if not current else "disabled"
+        await ctx.send(f"✅ Repost cache is now **{state}**.")
+
+    @vdl_cache.command(name="limits")
+    @commands.is_owner()
+    async def vdl_cache_limits(
+        self, ctx: commands.Context, max_mb: int, ttl_hours: float = 24
+    ):
+        """(Bot owner only) Set the cache's maximum size in MB and expiry in hours."""
+        if not 1 <= max_mb <= 100_000:
+            return await ctx.send("❌ Please set a size between 1 and 100000 MB.")
+        if not 0 < ttl_hours <= 24 * 30:
+            return await ctx.send("❌ Expiry must be between 0 and 720 hours.")
+        await self.config.cache_max_mb.set(max_mb)
+        await self.config.cache_ttl_hours.set(ttl_hours)
+        await self.cache.configure(max_bytes=max_mb * 1024 * 1024, ttl=ttl_hours * 3600)
+        await ctx.send(
+            f"✅ Cache limited to **{max_mb} MB**, entries expire after **{ttl_hours:g} hours**."
+        )
+
+    @vdl_cache.command(name="clear")
+    @commands.is_owner()
+    async def vdl_cache_clear(self, ctx: commands.Context):
+        """(Bot owner only) Delete every cached video."""
+        await self.cache.clear()
+        await ctx.send("✅ Repost cache cleared.")
+
+    @vdl.command(name="workers")
+    @commands.is_owner()
+    async def vdl_workers(
+        self, ctx: commands.Context, processes: int, timeout: int = 180
+    ):
+        """(Bot owner only) Set how many yt-dlp processes may run at once and their time limit in seconds."""
+        if not 1 <= processes <= 8:
+            return await ctx.send("❌ Please set between 1 and 8 processes.")
+        if not 10 <= timeout <= 1800:
+            return await ctx.send("❌ Timeout must be between 10 and 1800 seconds.")
+        await self.config.ytdlp_workers.set(processes)
+        await self.config.ytdlp_timeout.set(timeout)
+        self.ytdlp_pool.configure(max_workers=processes, timeout=timeout)
+        await ctx.send(
+            f"✅ yt-dlp will use up to **{processes}** processes, each killed after **{timeout}s**."
+        )
+
+    @vdl.command(name="hedge")
+    @commands.is_owner()
+    async def vdl_hedge(self, ctx: commands.Context, seconds: float = None):
+        """(Bot owner only) Show strategy stats, or set how long yt-dlp gets before RapidAPI is also tried.
+
+        Only applies to Instagram links when a RapidAPI key is set. Use 0 to
+        disable hedging and only fall back after yt-dlp has failed.
+        """
+        if seconds is not None:
+            if not 0 <= seconds <= 120:
+                return await ctx.send("❌ Please set a delay between 0 and 120 seconds.")
+            await self.config.hedge_delay.set(seconds)
+            if seconds:
+                return await ctx.send(
+                    f"✅ RapidAPI will be started if yt-dlp hasn't finished within **{seconds:g}s**."
+                )
+            return await ctx.send("✅ Hedging disabled, RapidAPI is only tried after yt-dlp fails.")
+
+        configured = await self.config.hedge_delay()
+        embed = discord.Embed(
+            title="Video Downloader Strategies", color=discord.Color.blurple()
+        )
+        embed.add_field(
+            name="Hedge Delay",
+            value=(
+                f"{self.strategies.hedge_delay('yt-dlp', configured):.1f}s "
+                f"(configured max {configured:g}s)"
+                if configured
+                else "Disabled"
+            ),
+            inline=False,
+        )
+        for name, stats in sorted(self.strategies.strategies.items()):
+            p50 = stats.latency(50)
+            p90 = stats.latency(90)
+            latency = (
+                f"p50 {p50:.1f}s · p90 {p90:.1f}s" if p50 is not None else "no successes yet"
+            )
+            embed.add_field(
+                name=name,
+                value=(
+                    f"{stats.success_rate:.0%} of {stats.attempts} succeeded · "
+                    f"{stats.wins} hedge wins\n{latency}"
+                ),
+                inline=False,
+            )
+        await ctx.send(embed=embed)
+
+    @vdl.command(name="scratch")
+    @commands.is_owner()
+    async def vdl_scratch(self, ctx: commands.Context, quota_mb: int = None):
+        """(Bot owner only) Show scratch disk usage, or set the quota in MB for in-progress downloads."""
+        if quota_mb is not None:
+            if not 50 <= quota_mb <= 100_000:
+                return await ctx.send("❌ Please set a quota between 50 and 100000 MB.")
+            await self.config.scratch_quota_mb.set(quota_mb)
+            self.scratch.quota_bytes = quota_mb * 1024 * 1024
+            return await ctx.send(
+                f"✅ In-progress downloads may use up to **{quota_mb} MB** of disk."
+            )
+
+        usage = await self.scratch.usage()
+        active = await self.scratch.active_usage()
+        await ctx.send(
+            f"💽 Scratch space: **{active / 1024 / 1024:.1f} / "
+            f"{self.scratch.quota_bytes / 1024 / 1024:.0f} MB** held by downloads in "
+            f"progress ({usage / 1024 / 1024:.1f} MB on disk) across "
+            f"**{len(self.scratch.jobs)}** jobs, **{self.scratch.waiting}** waiting for space."
+        )
+
+    @vdl.group(name="stats", invoke_without_command=True)
+    @commands.is_owner()
+    async def vdl_stats(self, ctx: commands.Context):
+        """(Bot owner only) Show per-stage timings, throughput and success rates of the download pipeline."""
+        m = self.metrics
+        embed = discord.Embed(
+            title="Video Downloader Stats", color=discord.Color.blurple()
+        )
+
+        def fmt(seconds):
+            return "–" if seconds is None else f"{seconds:.2f}s"
+
+        stage_lines = []
+        for stage in ("queue", "extract", "yt-dlp", "download", "transcode", "upload"):
+            count, p50, p95 = m.stage_summary(stage)
+            if count:
+                stage_lines.append(
+                    f"`{stage:<9}` p50 {fmt(p50)} · p95 {fmt(p95)} ({count})"
+                )
+        embed.add_field(
+            name="Stage Timings",
+            value="\n".join(stage_lines) or "No jobs yet.",
+            inline=False,
+        )
+
+        speed_lines = [
+            f"`{strategy:<8}` {m.throughput_summary(strategy) / 1024 / 1024:.2f} MB/s"
+            for strategy in sorted(m.throughput)
+        ]
+        embed.add_field(
+            name="Download Speed (median)",
+            value="\n".join(speed_lines) or "No downloads yet.",
+            inline=False,
+        )
+
+        outcome_lines = []
+        for platform, counts in sorted(m.outcomes.items()):
+            total = sum(counts.values())
+            outcome_lines.append(
+                f"**{platform}**: {counts['ok']}/{total} ok ({counts['ok'] / total:.0%})"
+            )
+        embed.add_field(
+            name="Success Rate",
+            value="\n".join(outcome_lines) or "No jobs yet.",
+            inline=False,
+        )
+        embed.add_field(
+            name="Errors",
+            value=(
+                ", ".join(f"{name}: {count}" for name, count in m.errors.most_common())
+                or "None"
+            ),
+            inline=False,
+        )
+        embed.set_footer(text="Since")
+        embed.timestamp = datetime.fromtimestamp(m.started, tz=timezone.utc)
+        await ctx.send(embed=embed)
+
+    @vdl_stats.command(name="reset")
+    @commands.is_owner()
+    async def vdl_stats_reset(self, ctx: commands.Context):
+        """(Bot owner only) Reset the pipeline stats."""
+        self.metrics.reset()
+        await ctx.send("✅ Video downloader stats reset.")
+
+    @vdl.command(name="queue")
+    async def vdl_queue(self, ctx: commands.Context):
+        """Show the download queue's depth, wait times and limits."""
+        stats = self.queue.stats()
+        embed = discord.Embed(
+            title="Video Downloader Queue", color=discord.Color.blurple()
+        )
+        embed.add_field(
+            name="Running",
+            value=f"{stats['running']} / {stats['concurrency']}",
+            inline=True,
+        )
+        embed.add_field(
+            name="Queued",
+            value=f"{stats['depth']} / {stats['max_pending']}",
+            inline=True,
+        )
+        embed.add_field(
+            name="This Server",
+            value=f"{self.queue.guild_depth(ctx.guild.id)} / {stats['max_pending_per_guild']} queued, max {stats['per_guild']} at once",
+            inline=True,
+        )
+        embed.add_field(
+            name="Wait Time",
+            value=(
+                f"avg {stats['avg_wait']:.1f}s · max {stats['max_wait']:.1f}s · "
+                f"oldest queued {stats['oldest_pending']:.1f}s"
+            ),
+            inline=False,
+        )
+        embed.add_field(
+            name="yt-dlp Processes",
+            value=(
+                f"{self.ytdlp_pool.running} / {self.ytdlp_pool.max_workers} running · "
+                f"{self.ytdlp_pool.waiting} waiting"
+            ),
+            inline=False,
+        )
+        embed.add_field(
+            name="Totals",
+            value=f"{stats['completed']} completed · {stats['rejected']} rejected",
+            inline=False,
+        )
+        await ctx.send(embed=embed)
+
+    @vdl.command(name="concurrency")
+    @commands.is_owner()
+    async def vdl_concurrency(
+        self,
+        ctx: commands.Context,
+        total: int,
+        per_guild: int = 1,
+        max_queued: int = 30,
+        max_queued_per_guild: int = MAX_LINKS_PER_MESSAGE,
+    ):
+        """(Bot owner only) Set how many downloads run at once and may wait, globally and per server."""
+        if not 1 <= total <= 20 or not 1 <= per_guild <= total:
+            return await ctx.send(
+                "❌ Total must be 1-20 and per-server must be between 1 and the total."
+            )
+        if not 1 <= max_queued <= 500:
+            return await ctx.send("❌ Max queued must be between 1 and 500.")
+        if not 1 <= max_queued_per_guild <= max_queued:
+            return await ctx.send(
+                "❌ Max queued per server must be between 1 and the max queued."
+            )
+        await self.config.max_concurrent_downloads.set(total)
+        await self.config.max_downloads_per_guild.set(per_guild)
+        await self.config.max_queued_downloads.set(max_queued)
+        await self.config.max_queued_per_guild.set(max_queued_per_guild)
+        self.queue.configure(
+            concurrency=total,
+            per_guild=per_guild,
+            max_pending=max_queued,
+            max_pending_per_guild=max_queued_per_guild,
+        )
+        note = ""
+        if max_queued_per_guild < MAX_LINKS_PER_MESSAGE - per_guild:
+            note = (
+                f"\n⚠️ A message with {MAX_LINKS_PER_MESSAGE} links will have some "
+                "of them skipped."
+            )
+        await ctx.send(
+            f"✅ Up to **{total}** downloads at once (**{per_guild}** per server), "
+            f"with at most **{max_queued}** queued (**{max_queued_per_guild}** per server)."
+            + note
+        )
+
     # ──────────────────────────────────────────────
     # Listener
     # ──────────────────────────────────────────────
@@ -206,183 +691,530 @@ class VideoDownloader(commands.Cog):
         if message.author.bot or not message.guild:
             return
 
-        cfg = await self.config.guild(message.guild).all()
+        # Cheapest rejection first: almost no messages contain a supported link
+        if not LINK_PATTERN.search(message.content):
+            return
+
+        cfg = await self._guild_settings(message.guild)
 
         if not cfg["enabled"]:
             return
 
-        watched = cfg["enabled_channels"]
+        watched = cfg["watched"]
         if watched and message.channel.id not in watched:
             return
 
-        match = LINK_PATTERN.search(message.content)
-        if not match:
-            return
+        urls = self._extract_links(message.content)
+        global_cfg = await self._global_settings()
 
-        url = match.group(0)
-        global_cfg = await self.config.all()
+        jobs = []
+        rejected = None
+        for url in urls[:MAX_LINKS_PER_MESSAGE]:
+            try:
+                job = self.queue.submit(
+                    message.guild.id,
+                    lambda url=url: self._prepare_video(url, cfg, global_cfg),
+                )
+            except QueueFullError as e:
+                rejected = e
+                break
+            jobs.append((url, job))
 
-        asyncio.create_task(self._handle_video(message, url, cfg, global_cfg))
+        if rejected is not None:
+            for url in urls[len(jobs) :]:
+                self.metrics.record_outcome(self._detect_platform(url), "queue_full")
+
+        if not jobs:
+            await message.reply(
+                (
+                    "⏳ Too many videos are already queued for this server, try again in a bit."
+                    if rejected.scope == "guild"
+                    else "⏳ The download queue is full right now, try again in a bit."
+                ),
+                delete_after=15,
+                mention_author=False,
+            )
+            return
+
+        task = asyncio.create_task(
+            self._handle_batch(message, cfg, jobs, skipped=len(urls) - len(jobs))
+        )
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
 
     # ──────────────────────────────────────────────
     # Core download logic
     # ──────────────────────────────────────────────
 
-    async def _handle_video(
-        self, message: discord.Message, url: str, cfg: dict, global_cfg: dict
-    ):
+    async def _prepare_video(
+        self, url: str, cfg: dict, global_cfg: dict
+    ) -> "_Media":
+        """Get a link's video onto disk, from the cache or a (shared) download."""
+        start = time.monotonic()
         max_bytes = cfg["max_filesize_mb"] * 1024 * 1024
-        is_instagram = "instagram.com" in url
-        is_tiktok = "tiktok.com" in url
+        cache_key = canonical_url(await self.resolver.resolve(self.session, url))
+        use_cache = global_cfg.get("cache_enabled", True)
+        transcode = cfg.get("transcode_oversized", False)
+
+        # ── Repost from cache without downloading again ──
+        entry = self.cache.get(cache_key, max_size=max_bytes) if use_cache else None
+        if entry is not None:
+            return _Media(
+                url,
+                str(self.cache.blob_path(entry)),
+                entry.title,
+                entry.filename,
+                source="cache",
+                elapsed=time.monotonic() - start,
+                pin=self.cache.pin(entry.digest),
+            )
 
-        video_path = None
-        title = "Video"
-        last_error = None
+        # ── Share one download between identical links ──
+        flight = self._join_flight(
+            cache_key, url, max_bytes, global_cfg, use_cache, transcode
+        )
+        try:
+            video_path, title, filename, _ = await asyncio.shield(flight.task)
+            file_size = os.path.getsize(video_path)
+            if file_size > max_bytes:
+                raise FileTooLargeError(file_size / (1024 * 1024))
+        except BaseException:
+            self._leave_flight(flight)
+            raise
+        return _Media(
+            url,
+            video_path,
+            title,
+            filename,
+            flight,
+            source="download",
+            elapsed=time.monotonic() - start,
+        )
 
+    async def _handle_batch(
+        self,
+        message: discord.Message,
+        cfg: dict,
+        jobs: list,
+        skipped: int = 0,
+    ):
+        """Wait for every link in a message and repost the videos in as few replies as possible."""
+        results = await asyncio.gather(
+            *(job.result for _, job in jobs), return_exceptions=True
+        )
+        media = [r for r in results if isinstance(r, _Media)]
+        # Failure category per link; None once a link's video has been posted
+        outcomes: dict[str, Optional[str]] = {}
         try:
-            if is_tiktok:
-                # ── TikTok: always use tikwm.com API ──
-                try:
-                    tmp_dir = tempfile.mkdtemp()
-                    video_path, title = await self._download_via_tikwm(
-                        url, tmp_dir, max_bytes
+            errors = []
+            for (url, job), result in zip(jobs, results):
+                self.metrics.record_stage("queue", job.wait)
+                if isinstance(result, _Media):
+                    continue
+                outcomes[url] = self._categorize_error(result)
+                prefix = f"<{url}>: " if len(jobs) > 1 else ""
+                if isinstance(result, FileTooLargeError):
+                    errors.append(
+                        f"{prefix}⚠️ Video is too large to upload ({result.size_mb:.1f} MB > {cfg['max_filesize_mb']} MB)."
                     )
-                except FileTooLargeError:
-                    raise
-                except Exception as e:
-                    last_error = e
-                    video_path = None
-            else:
-                # ── Strategy 1: yt-dlp direct (Instagram / Twitter / X) ──
-                try:
-                    video_path, title = await asyncio.get_event_loop().run_in_executor(
-                        None,
-                        self._download_video,
-                        url,
-                        max_bytes,
-                        global_cfg.get("ffmpeg_location", ""),
-                        global_cfg.get("cookies_file", ""),
+                # ── All strategies failed ──
+                else:
+                    errors.append(
+                        f"{prefix}❌ Could not download video: `{type(result).__name__}: {result}`"
                     )
-                except FileTooLargeError:
-                    raise
-                except Exception as e:
-                    last_error = e
-                    video_path = None
-
-                # ── Strategy 2: RapidAPI fallback (Instagram only) ──
-                if (
-                    video_path is None
-                    and is_instagram
-                    and global_cfg.get("rapidapi_key")
-                ):
-                    try:
-                        tmp_dir = tempfile.mkdtemp()
-                        video_path, title = await self._download_via_rapidapi(
-                            url, tmp_dir, global_cfg["rapidapi_key"], max_bytes
+            if skipped:
+                errors.append(
+                    f"⏳ Skipped {skipped} more link(s); repost them in a separate message."
+                )
+
+            # ── Upload to Discord ──
+            max_bytes = cfg["max_filesize_mb"] * 1024 * 1024
+            for group in self._pack_uploads(media, max_bytes):
+                try:
+                    async with self.metrics.time("upload"):
+                        await message.reply(
+                            "\n".join(
+                                f"📹 **{m.title}** — via **{self._detect_platform(m.url)}**"
+                                for m in group
+                            ),
+                            files=[
+                                discord.File(m.path, filename=m.filename) for m in group
+                            ],
+                            mention_author=False,
                         )
-                    except FileTooLargeError:
-                        raise
-                    except Exception as e:
-                        last_error = e
-                        video_path = None
+                except (discord.HTTPException, OSError) as e:
+                    for m in group:
+                        outcomes[m.url] = self._categorize_error(e)
+                    errors.append(f"❌ Could not upload video: `{e}`")
+                else:
+                    for m in group:
+                        outcomes[m.url] = None
+
+            if errors:
+                await message.reply(
+                    "\n".join(errors), delete_after=15, mention_author=False
+                )
+            elif media and cfg["delete_original_message"]:
+                try:
+                    await message.delete()
+                except discord.Forbidden:
+                    pass
 
-        except FileTooLargeError as e:
-            await message.reply(
-                f"⚠️ Video is too large to upload ({e.size_mb:.1f} MB > {cfg['max_filesize_mb']} MB).",
-                delete_after=15,
-                mention_author=False,
+        finally:
+            for m in media:
+                if m.flight is not None:
+                    self._leave_flight(m.flight)
+                if m.pin is not None:
+                    self.cache.unpin(m.pin)
+            self._record_batch(message, jobs, results, outcomes)
+
+    def _record_batch(
+        self, message: discord.Message, jobs: list, results: list, outcomes: dict
+    ):
+        """Count each link's outcome and write one structured log line per link."""
+        for (url, job), result in zip(jobs, results):
+            platform = self._detect_platform(url)
+            category = outcomes.get(url, "cancelled")
+            self.metrics.record_outcome(platform, category)
+            is_media = isinstance(result, _Media)
+            log.info(
+                "vdl job guild=%s platform=%s outcome=%s source=%s queue_wait=%.2f prepare=%.2f bytes=%s",
+                message.guild.id,
+                platform,
+                category or "ok",
+                result.source if is_media else "-",
+                job.wait,
+                result.elapsed if is_media else 0.0,
+                self._file_size(result.path) if is_media else 0,
             )
-            return
 
-        # ── All strategies failed ──
-        if video_path is None:
-            await message.reply(
-                f"❌ Could not download video: `{type(last_error).__name__}: {last_error}`",
-                delete_after=15,
-                mention_author=False,
+    @staticmethod
+    def _file_size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _categorize_error(error: BaseException) -> str:
+        """Bucket a failed link's error for the stats counters."""
+        if isinstance(error, FileTooLargeError):
+            return "too_large"
+        if isinstance(error, asyncio.CancelledError):
+            return "cancelled"
+        if isinstance(error, (WorkerTimeoutError, asyncio.TimeoutError)):
+            return "timeout"
+        if isinstance(error, WorkerError):
+            return "extractor"
+        if isinstance(error, aiohttp.ClientError):
+            return "network"
+        if isinstance(error, discord.HTTPException):
+            return "upload"
+        if isinstance(error, OSError):
+            return "disk"
+        if isinstance(error, RuntimeError):
+            return "api"
+        return "other"
+
+    @staticmethod
+    def _pack_uploads(media: list, max_bytes: int) -> list:
+        """Group videos into replies of at most 10 files and max_bytes in total."""
+        groups = []
+        group, group_size = [], 0
+        for m in media:
+            size = VideoDownloader._file_size(m.path)
+            if group and (
+                len(group) >= MAX_ATTACHMENTS or group_size + size > max_bytes
+            ):
+                groups.append(group)
+                group, group_size = [], 0
+            group.append(m)
+            group_size += size
+        if group:
+            groups.append(group)
+        return groups
+
+    def _join_flight(
+        self,
+        cache_key: str,
+        url: str,
+        max_bytes: int,
+        global_cfg: dict,
+        use_cache: bool,
+        transcode: bool,
+    ) -> "_Flight":
+        """Attach to the in-progress download of this link, starting one if needed."""
+        flight_key = (cache_key, max_bytes, transcode)
+        flight = self._inflight.get(flight_key)
+        if flight is None:
+            flight = _Flight(cached=use_cache)
+            flight.task = asyncio.ensure_future(
+                self._run_flight(
+                    flight, cache_key, url, max_bytes, global_cfg, use_cache, transcode
+                )
             )
+            self._inflight[flight_key] = flight
+
+            def on_done(_):
+                self._inflight.pop(flight_key, None)
+                if flight.holders == 0:
+                    self._finish_flight(flight)
+
+            flight.task.add_done_callback(on_done)
+        flight.holders += 1
+        return flight
+
+    def _leave_flight(self, flight: "_Flight"):
+        """Release a shared download, cleaning up once nobody needs it."""
+        flight.holders -= 1
+        if flight.holders > 0:
+            return
+        if not flight.task.done():
+            # Every requester gave up; only keep going if the cache wants the file.
+            if not flight.cached:
+                flight.task.cancel()
+            return
+        self._finish_flight(flight)
+
+    def _finish_flight(self, flight: "_Flight"):
+        """Delete a finished download's scratch directory, and any uncached result in it."""
+        if flight.pin is not None:
+            pin, flight.pin = flight.pin, None
+            self.cache.unpin(pin)
+        if flight.workdir is None:
             return
+        workdir, flight.workdir = flight.workdir, None
+        asyncio.ensure_future(self.scratch.release(workdir))
+
+    async def _run_flight(self, flight: "_Flight", *args) -> tuple[str, str, str, bool]:
+        flight.workdir = await self.scratch.acquire()
+        result = await self._download_and_store(*args, flight.workdir)
+        # The file now waits on the rest of its batch, which may need the quota
+        await self.scratch.settle(flight.workdir)
+        # Pin a cached result before anything else can run and evict it
+        if result[3]:
+            flight.pin = self.cache.pin(Path(result[0]).stem)
+        return result
+
+    async def _download_and_store(
+        self,
+        cache_key: str,
+        url: str,
+        max_bytes: int,
+        global_cfg: dict,
+        use_cache: bool,
+        transcode: bool,
+        workdir: Path,
+    ) -> tuple[str, str, str, bool]:
+        """Download a link, shrinking it to fit if needed, and move it into the cache.
+
+        Returns (filepath, title, filename, whether the file now lives in the cache).
+        """
+        fit_key = f"{cache_key}#fit={max_bytes}"
+        source = None
+        if use_cache and transcode:
+            # _prepare_video already counted this link's lookup
+            fitted = self.cache.get(fit_key, count=False)
+            if fitted is not None:
+                return (
+                    str(self.cache.blob_path(fitted)),
+                    fitted.title,
+                    fitted.filename,
+                    True,
+                )
+            # A bigger original cached for another server can be transcoded directly
+            source = self.cache.get(cache_key, count=False)
+
+        if source is not None:
+            video_path = str(self.cache.blob_path(source))
+            title, filename, stored = source.title, source.filename, True
+            # Keep the original on disk while it is being transcoded
+            self.cache.pin(source.digest)
+        else:
+            limit = (
+                max(max_bytes, TRANSCODE_SOURCE_MAX_MB * 1024 * 1024)
+                if transcode
+                else max_bytes
+            )
+            video_path, title = await self._download(url, limit, global_cfg, workdir)
+            filename = Path(video_path).name
+            stored = False
+            if use_cache:
+                video_path, stored = await self._store(cache_key, video_path, title)
 
-        # ── Upload to Discord ──
         try:
-            file_size = os.path.getsize(video_path)
-            if file_size > max_bytes:
-                await message.reply(
-                    f"⚠️ Video is too large to upload ({file_size / 1024 / 1024:.1f} MB > {cfg['max_filesize_mb']} MB).",
-                    delete_after=15,
-                    mention_author=False,
-                )
-                return
+            size = os.path.getsize(video_path)
+            if size <= max_bytes or not transcode:
+                return video_path, title, filename, stored
 
-            platform = self._detect_platform(url)
-            caption = f"📹 **{title}** — via **{platform}**"
+            # ── Transcode-to-fit stage ──
+            try:
+                async with self.metrics.time("transcode"):
+                    fitted_path = await self._transcode_to_fit(
+                        video_path,
+                        Path(filename).stem,
+                        size,
+                        max_bytes,
+                        self._subdir(workdir, "transcode"),
+                        global_cfg.get("ffmpeg_location", ""),
+                    )
+            finally:
+                if not stored:
+                    try:
+                        os.remove(video_path)
+                    except OSError:
+                        pass
+        finally:
+            if source is not None:
+                self.cache.unpin(source.digest)
 
-            await message.reply(
-                caption,
-                file=discord.File(video_path, filename=Path(video_path).name),
-                mention_author=False,
+        filename = Path(fitted_path).name
+        stored = False
+        if use_cache:
+            fitted_path, stored = await self._store(fit_key, fitted_path, title)
+        return fitted_path, title, filename, stored
+
+    async def _store(self, key: str, video_path: str, title: str) -> tuple[str, bool]:
+        """Move a file into the cache. Returns (new path, whether it was cached)."""
+        try:
+            entry = await self.cache.put(key, video_path, title)
+        except OSError as e:
+            log.warning("Could not cache %s: %s", key, e)
+            return video_path, False
+        return str(self.cache.blob_path(entry)), True
+
+    async def _download(
+        self, url: str, max_bytes: int, global_cfg: dict, workdir: Path
+    ) -> tuple[str, str]:
+        """Run the download strategies for a link. Returns (filepath, title).
+
+        Raises FileTooLargeError straight away, otherwise the last strategy's error.
+        """
+        is_instagram = "instagram.com" in url
+        is_tiktok = "tiktok.com" in url
+        rapidapi_key = global_cfg.get("rapidapi_key")
+
+        if is_tiktok:
+            # ── TikTok: always use tikwm.com API ──
+            tmp_dir = self._subdir(workdir, "tikwm")
+            return await self.strategies.timed(
+                "tikwm", self._download_via_tikwm(url, tmp_dir, max_bytes)
             )
 
-            if cfg["delete_original_message"]:
-                try:
-                    await message.delete()
-                except discord.Forbidden:
-                    pass
+        # ── Strategy 1: yt-dlp direct (Instagram / Twitter / X) ──
+        def ytdlp():
+            return self.strategies.timed(
+                "yt-dlp",
+                self._download_video(
+                    url,
+                    self._subdir(workdir, "yt-dlp"),
+                    max_bytes,
+                    global_cfg.get("ffmpeg_location", ""),
+                    global_cfg.get("cookies_file", ""),
+                ),
+            )
 
-        finally:
-            try:
-                os.remove(video_path)
-            except OSError:
-                pass
+        # ── Strategy 2: RapidAPI fallback (Instagram only) ──
+        def rapidapi():
+            return self.strategies.timed(
+                "rapidapi",
+                self._download_via_rapidapi(
+                    url, self._subdir(workdir, "rapidapi"), rapidapi_key, max_bytes
+                ),
+            )
+
+        if not (is_instagram and rapidapi_key):
+            return await ytdlp()
+
+        hedge_delay = global_cfg.get("hedge_delay", 0)
+        if hedge_delay > 0:
+            # Start RapidAPI too if yt-dlp is slow, keeping whichever finishes first
+            winner, result = await hedged(
+                ytdlp,
+                rapidapi,
+                self.strategies.hedge_delay("yt-dlp", hedge_delay),
+                fatal=(FileTooLargeError,),
+            )
+            self.strategies.get(("yt-dlp", "rapidapi")[winner]).wins += 1
+            return result
+
+        try:
+            return await ytdlp()
+        except FileTooLargeError:
+            raise
+        except Exception:
+            pass
+        return await rapidapi()
 
     # ──────────────────────────────────────────────
     # Download strategies
     # ──────────────────────────────────────────────
 
-    def _download_video(
+    async def _download_video(
         self,
         url: str,
+        tmp_dir: str,
         max_bytes: int,
         ffmpeg_location: str = "",
         cookies_file: str = "",
     ) -> tuple[str, str]:
-        """Synchronous yt-dlp download. Returns (filepath, title)."""
-        tmp_dir = tempfile.mkdtemp()
+        """yt-dlp download in a worker process. Returns (filepath, title)."""
         output_template = os.path.join(tmp_dir, "%(title).50s.%(ext)s")
 
-        ydl_opts = {
-            "outtmpl": output_template,
-            "format": "best[ext=mp4]/best/bestvideo*+bestaudio",
-            "merge_output_format": "mp4",
-            "quiet": True,
-            "no_warnings": True,
-            "noplaylist": True,
-            "http_headers": {
-                "User-Agent": (
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/125.0.0.0 Safari/537.36"
-                ),
-                "Accept-Language": "en-US,en;q=0.9",
-                "Accept": "*/*",
-            },
-            "retries": 3,
-            "fragment_retries": 3,
-        }
+        args = [
+            sys.executable,
+            "-m",
+            "yt_dlp",
+            "--output",
+            output_template,
+            "--format",
+            "best[ext=mp4]/best/bestvideo*+bestaudio",
+            "--merge-output-format",
+            "mp4",
+            "--no-warnings",
+            "--no-playlist",
+            "--no-progress",
+            "--encoding",
+            "utf-8",
+            "--print",
+            "after_move:%(title|Video)s",
+            "--add-header",
+            (
+                "User-Agent:Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                "AppleWebKit/537.36 (KHTML, like Gecko) "
+                "Chrome/125.0.0.0 Safari/537.36"
+            ),
+            "--add-header",
+            "Accept-Language:en-US,en;q=0.9",
+            "--add-header",
+            "Accept:*/*",
+            "--retries",
+            "3",
+            "--fragment-retries",
+            "3",
+        ]
 
         if ffmpeg_location and os.path.isfile(ffmpeg_location):
-            ydl_opts["ffmpeg_location"] = str(Path(ffmpeg_location).parent)
+            args += ["--ffmpeg-location", str(Path(ffmpeg_location).parent)]
 
         if cookies_file and os.path.isfile(cookies_file):
-            ydl_opts["cookiefile"] = cookies_file
-
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            title = info.get("title", "Video")
-            files = list(Path(tmp_dir).glob("*"))
-            if not files:
-                raise RuntimeError("yt-dlp ran but no file was saved.")
-            return str(files[0]), title
+            args += ["--cookies", cookies_file]
+
+        args += ["--", url]
+
+        start = time.monotonic()
+        async with self.metrics.time("yt-dlp"):
+            stdout, _ = await self.ytdlp_pool.run(*args)
+        lines = [line for line in stdout.splitlines() if line.strip()]
+        title = lines[-1].strip() if lines else "Video"
+        files = list(Path(tmp_dir).glob("*"))
+        if not files:
+            raise RuntimeError("yt-dlp ran but no file was saved.")
+        # yt-dlp extracts and downloads in one go, so this includes extraction time
+        self.metrics.record_download(
+            "yt-dlp", os.path.getsize(files[0]), time.monotonic() - start
+        )
+        return str(files[0]), title
 
     async def _download_via_tikwm(
         self,
@@ -391,52 +1223,44 @@ class VideoDownloader(commands.Cog):
         max_bytes: int,
     ) -> tuple[str, str]:
         """Download TikTok video via tikwm.com API (no watermark). Returns (filepath, title)."""
-        async with aiohttp.ClientSession() as session:
-            # tikwm accepts short URLs directly — no need to expand first
-            async with session.get(
-                TIKWM_API,
-                params={"url": url, "hd": 1},
-                headers={"User-Agent": "Mozilla/5.0"},
-                timeout=aiohttp.ClientTimeout(total=30),
-            ) as resp:
-                if resp.status != 200:
-                    raise RuntimeError(f"tikwm API returned HTTP {resp.status}")
-                data = await resp.json(content_type=None)
-
-            if data.get("code") != 0:
+        start = time.monotonic()
+        # tikwm accepts short URLs directly — no need to expand first
+        async with self.session.get(
+            TIKWM_API,
+            params={"url": url, "hd": 1},
+            headers={"User-Agent": "Mozilla/5.0"},
+            timeout=aiohttp.ClientTimeout(total=30),
+        ) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"tikwm API returned HTTP {resp.status}")
+            data = await resp.json(content_type=None)
+
+        if data.get("code") != 0:
+            raise RuntimeError(
+                f"tikwm API error {data.get('code')}: {data.get('msg', 'unknown error')}"
+            )
+
+        video_data = data.get("data", {})
+        # Prefer HD play URL, fall back to standard play URL
+        video_url = video_data.get("hdplay") or video_data.get("play")
+        if not video_url:
+            raise RuntimeError(f"tikwm returned no video URL. Response: {data}")
+
+        title = (video_data.get("title") or "TikTok Video")[:100]
+        self.metrics.record_stage("extract", time.monotonic() - start)
+
+        async with self.session.get(
+            video_url,
+            headers={"User-Agent": "Mozilla/5.0"},
+            timeout=aiohttp.ClientTimeout(total=120),
+        ) as video_resp:
+            if video_resp.status != 200:
                 raise RuntimeError(
-                    f"tikwm API error {data.get('code')}: {data.get('msg', 'unknown error')}"
+                    f"Failed to fetch TikTok video stream: HTTP {video_resp.status}"
                 )
 
-            video_data = data.get("data", {})
-            # Prefer HD play URL, fall back to standard play URL
-            video_url = video_data.get("hdplay") or video_data.get("play")
-            if not video_url:
-                raise RuntimeError(f"tikwm returned no video URL. Response: {data}")
-
-            title = (video_data.get("title") or "TikTok Video")[:100]
-
-            async with session.get(
-                video_url,
-                headers={"User-Agent": "Mozilla/5.0"},
-                timeout=aiohttp.ClientTimeout(total=120),
-            ) as video_resp:
-                if video_resp.status != 200:
-                    raise RuntimeError(
-                        f"Failed to fetch TikTok video stream: HTTP {video_resp.status}"
-                    )
-
-                content_length = int(video_resp.headers.get("Content-Length", 0))
-                if content_length and content_length > max_bytes:
-                    raise FileTooLargeError(content_length / (1024 * 1024))
-
-                filename = os.path.join(tmp_dir, "tiktok_video.mp4")
-                with open(filename, "wb") as f:
-                    f.write(await video_resp.read())
-
-        actual_size = os.path.getsize(filename)
-        if actual_size > max_bytes:
-            raise FileTooLargeError(actual_size / (1024 * 1024))
+            filename = os.path.join(tmp_dir, "tiktok_video.mp4")
+            await self._stream_to_file(video_resp, filename, max_bytes, "tikwm")
 
         return filename, title
 
@@ -448,58 +1272,215 @@ class VideoDownloader(commands.Cog):
         max_bytes: int,
     ) -> tuple[str, str]:
         """Async RapidAPI Instagram downloader fallback. Returns (filepath, title)."""
+        start = time.monotonic()
         headers = {
             "x-rapidapi-key": api_key,
             "x-rapidapi-host": "instagram-downloader-download-instagram-videos-stories.p.rapidapi.com",
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                "https://instagram-downloader-download-instagram-videos-stories.p.rapidapi.com/index",
-                params={"url": url},
-                headers=headers,
-            ) as resp:
-                if resp.status != 200:
-                    raise RuntimeError(f"RapidAPI returned HTTP {resp.status}")
-                data = await resp.json()
-
-            video_url = (
-                data.get("media")
-                or data.get("url")
-                or data.get("video_url")
-                or (
-                    data.get("links", [{}])[0].get("link")
-                    if data.get("links")
-                    else None
-                )
+        async with self.session.get(
+            "https://instagram-downloader-download-instagram-videos-stories.p.rapidapi.com/index",
+            params={"url": url},
+            headers=headers,
+        ) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"RapidAPI returned HTTP {resp.status}")
+            data = await resp.json()
+
+        video_url = (
+            data.get("media")
+            or data.get("url")
+            or data.get("video_url")
+            or (
+                data.get("links", [{}])[0].get("link")
+                if data.get("links")
+                else None
+            )
+        )
+        if not video_url:
+            raise RuntimeError(
+                f"RapidAPI response had no video URL. Response: {data}"
             )
-            if not video_url:
+
+        title = data.get("title") or data.get("caption") or "Instagram Video"
+        self.metrics.record_stage("extract", time.monotonic() - start)
+
+        async with self.session.get(video_url) as video_resp:
+            if video_resp.status != 200:
                 raise RuntimeError(
-                    f"RapidAPI response had no video URL. Response: {data}"
+                    f"Failed to fetch video stream: HTTP {video_resp.status}"
                 )
 
-            title = data.get("title") or data.get("caption") or "Instagram Video"
+            filename = os.path.join(tmp_dir, "video.mp4")
+            await self._stream_to_file(video_resp, filename, max_bytes, "rapidapi")
 
-            async with session.get(video_url) as video_resp:
-                if video_resp.status != 200:
-                    raise RuntimeError(
-                        f"Failed to fetch video stream: HTTP {video_resp.status}"
-                    )
+        return filename, title
+
+    # ──────────────────────────────────────────────
+    # Transcoding
+    # ──────────────────────────────────────────────
 
-                content_length = int(video_resp.headers.get("Content-Length", 0))
-                if content_length and content_length > max_bytes:
-                    raise FileTooLargeError(content_length / (1024 * 1024))
+    async def _transcode_to_fit(
+        self,
+        source: str,
+        stem: str,
+        size: int,
+        max_bytes: int,
+        tmp_dir: str,
+        ffmpeg_location: str = "",
+    ) -> str:
+        """Re-encode a video so it fits in max_bytes. Returns the new file's path.
+
+        The bitrate is worked out from the video's duration and the size limit,
+        and the video is scaled down when that bitrate is too low for its
+        resolution. Raises FileTooLargeError if it can't be made to fit.
+        """
+        ffmpeg = self._find_binary("ffmpeg", ffmpeg_location)
+        ffprobe = self._find_binary("ffprobe", ffmpeg_location)
+        if not ffmpeg or not ffprobe:
+            raise FileTooLargeError(size / (1024 * 1024))
+
+        stdout, _ = await self.ffmpeg_pool.run(
+            ffprobe,
+            "-v",
+            "error",
+            "-show_entries",
+            "format=duration",
+            "-of",
+            "default=noprint_wrappers=1:nokey=1",
+            source,
+        )
+        try:
+            duration = float(stdout.strip())
+        except ValueError:
+            raise RuntimeError("ffprobe could not read the video's duration.") from None
+        if duration <= 0:
+            raise RuntimeError("ffprobe reported an empty video.")
+
+        # Leave headroom for container overhead and encoder overshoot
+        budget_kbps = max_bytes * 8 * 0.92 / duration / 1000
+        video_kbps = int(budget_kbps - TRANSCODE_AUDIO_KBPS)
+        if video_kbps < TRANSCODE_MIN_VIDEO_KBPS:
+            raise FileTooLargeError(size / (1024 * 1024))
+
+        if video_kbps < 600:
+            max_height = 480
+        elif video_kbps < 1500:
+            max_height = 720
+        else:
+            max_height = 1080
 
-                filename = os.path.join(tmp_dir, "video.mp4")
-                with open(filename, "wb") as f:
-                    f.write(await video_resp.read())
+        output = os.path.join(tmp_dir, f"{stem}.mp4")
+        try:
+            for factor in (1.0, 0.8):
+                kbps = int(video_kbps * factor)
+                await self.ffmpeg_pool.run(
+                    ffmpeg,
+                    "-hide_banner",
+                    "-loglevel",
+                    "error",
+                    "-y",
+                    "-i",
+                    source,
+                    "-vf",
+                    f"scale=-2:'min({max_height},ih)'",
+                    "-c:v",
+                    "libx264",
+                    "-preset",
+                    "veryfast",
+                    "-b:v",
+                    f"{kbps}k",
+                    "-maxrate",
+                    f"{kbps}k",
+                    "-bufsize",
+                    f"{kbps * 2}k",
+                    "-c:a",
+                    "aac",
+                    "-b:a",
+                    f"{TRANSCODE_AUDIO_KBPS}k",
+                    "-movflags",
+                    "+faststart",
+                    output,
+                )
+                if os.path.getsize(output) <= max_bytes:
+                    return output
+            raise FileTooLargeError(os.path.getsize(output) / (1024 * 1024))
+        except BaseException:
+            try:
+                os.remove(output)
+            except OSError:
+                pass
+            raise
 
-        return filename, title
+    @staticmethod
+    def _subdir(workdir: Path, name: str) -> str:
+        """Create and return a strategy's own folder inside a job's scratch directory."""
+        path = workdir / name
+        path.mkdir(exist_ok=True)
+        return str(path)
+
+    @staticmethod
+    def _find_binary(name: str, ffmpeg_location: str = "") -> Optional[str]:
+        """Find ffmpeg or ffprobe, preferring the configured ffmpeg's directory."""
+        if ffmpeg_location and os.path.isfile(ffmpeg_location):
+            path = Path(ffmpeg_location)
+            candidate = path.with_name(path.name.replace("ffmpeg", name))
+            if candidate.is_file():
+                return str(candidate)
+        return shutil.which(name)
 
     # ──────────────────────────────────────────────
     # Helpers
     # ──────────────────────────────────────────────
 
+    async def _stream_to_file(
+        self,
+        resp: aiohttp.ClientResponse,
+        filename: str,
+        max_bytes: int,
+        strategy: str,
+    ) -> int:
+        """Write a response body to disk in chunks, aborting once it exceeds max_bytes.
+
+        Returns the number of bytes written. The partial file is removed if the
+        download is cut off.
+        """
+        content_length = resp.content_length or 0
+        if content_length > max_bytes:
+            raise FileTooLargeError(content_length / (1024 * 1024))
+
+        written = 0
+        start = time.monotonic()
+        try:
+            with open(filename, "wb") as f:
+                async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                    written += len(chunk)
+                    if written > max_bytes:
+                        raise FileTooLargeError(written / (1024 * 1024))
+                    f.write(chunk)
+        except BaseException:
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+            raise
+        elapsed = time.monotonic() - start
+        self.metrics.record_stage("download", elapsed)
+        self.metrics.record_download(strategy, written, elapsed)
+        return written
+
+    @staticmethod
+    def _extract_links(content: str) -> list:
+        """Every supported link in a message, without repeats of the same post."""
+        urls, seen = [], set()
+        for match in LINK_PATTERN.finditer(content):
+            url = match.group(0)
+            key = canonical_url(url)
+            if key not in seen:
+                seen.add(key)
+                urls.append(url)
+        return urls
+
     @staticmethod
     def _detect_platform(url: str) -> str:
         if "instagram.com" in url:
@@ -511,6 +1492,62 @@ class VideoDownloader(commands.Cog):
         return "Unknown"
 
 
+class _Media:
+    """A video ready to upload, and the shared download it came from, if any."""
+
+    __slots__ = (
+        "url",
+        "path",
+        "title",
+        "filename",
+        "flight",
+        "source",
+        "elapsed",
+        "pin",
+    )
+
+    def __init__(
+        self,
+        url: str,
+        path: str,
+        title: str,
+        filename: str,
+        flight: Optional["_Flight"] = None,
+        source: str = "download",
+        elapsed: float = 0.0,
+        pin: Optional[str] = None,
+    ):
+        self.url = url
+        self.path = path
+        self.title = title
+        self.filename = filename
+        self.flight = flight
+        self.source = source
+        self.elapsed = elapsed
+        # Digest of the cache blob pinned for this upload, if any
+        self.pin = pin
+
+
+class _Flight:
+    """A download shared by every request for the same link.
+
+    ``cached`` records whether the result is headed for the repost cache, in
+    which case the file outlives the requests waiting on it. ``workdir`` is
+    the job's scratch directory, deleted once the download is done and every
+    requester has finished with it; ``pin`` is the cache blob held for them
+    until then.
+    """
+
+    __slots__ = ("task", "cached", "holders", "workdir", "pin")
+
+    def __init__(self, cached: bool):
+        self.task: Optional[asyncio.Future] = None
+        self.cached = cached
+        self.holders = 0
+        self.workdir: Optional[Path] = None
+        self.pin: Optional[str] = None
+
+
 class FileTooLargeError(Exception):
     def __init__(self, size_mb: float):
         self.size_mb = size_mb
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import os
+import signal
+from typing import Optional
+
+log = logging.getLogger("red.videodownloader.workers")
+
+# Workers lead their own process group so helpers they spawn (e.g. yt-dlp's
+# ffmpeg merge) can be killed with them; Windows has no process groups.
+USE_PROCESS_GROUPS = hasattr(os, "killpg")
+
+
+class WorkerError(RuntimeError):
+    """A worker process exited with a non-zero status."""
+
+    def __init__(self, name: str, returncode: int, stderr: str):
+        self.returncode = returncode
+        lines = [line for line in stderr.strip().splitlines() if line.strip()]
+        detail = lines[-1] if lines else f"exit status {returncode}"
+        super().__init__(f"{name}: {detail}")
+
+
+class WorkerTimeoutError(RuntimeError):
+    """A worker process ran past its time limit and was killed."""
+
+    def __init__(self, name: str, timeout: float):
+        super().__init__(f"{name} timed out after {timeout:.0f}s")
+
+
+class ProcessPool:
+    """Runs external commands in at most ``max_workers`` processes at once.
+
+    Every job gets its own subprocess, so heavy work never shares the GIL with
+    the bot's event loop. A job that times out or whose caller is cancelled
+    has its whole process group killed rather than left running in the
+    background.
+
+    ``env`` replaces the environment jobs start with; ``None`` inherits the
+    bot's.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_workers: int = 2,
+        timeout: float = 180,
+        env: Optional[dict[str, str]] = None,
+    ):
+        self.name = name
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.env = env
+        self._slots = asyncio.Semaphore(max_workers)
+        self._procs: set[asyncio.subprocess.Process] = set()
+        self.waiting = 0
+
+    @property
+    def running(self) -> int:
+        return len(self._procs)
+
+    def configure(self, max_workers: Optional[int] = None, timeout: Optional[float] = None):
+        """Change limits; jobs already holding a slot finish under the old ones."""
+        if max_workers is not None and max_workers != self.max_workers:
+            self.max_workers = max_workers
+            self._slots = asyncio.Semaphore(max_workers)
+        if timeout is not None:
+            self.timeout = timeout
+
+    async def run(self, *args: str, timeout: Optional[float] = None) -> tuple[str, str]:
+        """Run a command and return its (stdout, stderr) once it exits successfully."""
+        timeout = timeout or self.timeout
+        slots = self._slots
+        self.waiting += 1
+        try:
+            await slots.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *args,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                env=self.env,
+                start_new_session=USE_PROCESS_GROUPS,
+            )
+            self._procs.add(proc)
+            try:
+                stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+            except asyncio.TimeoutError:
+                await self._kill(proc)
+                raise WorkerTimeoutError(self.name, timeout) from None
+            except asyncio.CancelledError:
+                await asyncio.shield(self._kill(proc))
+                raise
+            finally:
+                self._procs.discard(proc)
+        finally:
+            slots.release()
+
+        out = stdout.decode("utf-8", "replace")
+        err = stderr.decode("utf-8", "replace")
+        if proc.returncode != 0:
+            raise WorkerError(self.name, proc.returncode, err)
+        return out, err
+
+    @staticmethod
+    def _signal(proc: asyncio.subprocess.Process):
+        """Kill a worker and, where supported, every process it started."""
+        try:
+            if USE_PROCESS_GROUPS:
+                # The group outlives its leader while children are still running
+                os.killpg(proc.pid, signal.SIGKILL)
+            elif proc.returncode is None:
+                proc.kill()
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    async def _kill(self, proc: asyncio.subprocess.Process):
+        self._signal(proc)
+        if proc.returncode is None:
+            await proc.wait()
+
+    def close(self):
+        """Kill every running worker process group."""
+        for proc in list(self._procs):
+            self._signal(proc)
+        self._procs.clear()
@@ -1,7 +1,169 @@
+import asyncio
+import difflib
 import discord
+from collections import OrderedDict
 from redbot.core import commands, Config, checks
 from redbot.core.bot import Red
-from typing import List
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+EMPTY: FrozenSet[int] = frozenset()
+DECISION_CACHE_SIZE = 4096
+# Minimum similarity for a fuzzy name match when there is no exact one
+FUZZY_CUTOFF = 0.8
+
+
+class LockdownMatrix:
+    """A guild's lockdown config compiled for the global check.
+
+    Trusted items are inverted into item -> ids that may use it, so a check is
+    a handful of set lookups against the member's role ids.
+    """
+
+    __slots__ = ("enabled", "all_roles", "all_users", "item_roles", "item_users")
+
+    def __init__(self, data: Dict):
+        self.enabled: bool = data["lockdown_enabled"]
+        self.all_roles, self.item_roles = self._invert(data["trusted_roles"])
+        self.all_users, self.item_users = self._invert(data["trusted_users"])
+
+    @staticmethod
+    def _invert(trusted: Dict):
+        full = set()
+        by_item: Dict[str, set] = {}
+        for id_, info in trusted.items():
+            if info["access"] == "all":
+                full.add(int(id_))
+                continue
+            for item in info["cogs"]:
+                by_item.setdefault(item.lower(), set()).add(int(id_))
+        return frozenset(full), {k: frozenset(v) for k, v in by_item.items()}
+
+    def allows(
+        self, member: discord.Member, cog_name: Optional[str], full_cmd: Optional[str]
+    ) -> bool:
+        if member.id in self.all_users:
+            return True
+        for item in (cog_name, full_cmd):
+            if item and member.id in self.item_users.get(item, EMPTY):
+                return True
+
+        role_ids = {r.id for r in member.roles}
+        if not self.all_roles.isdisjoint(role_ids):
+            return True
+        for item in (cog_name, full_cmd):
+            if item and not self.item_roles.get(item, EMPTY).isdisjoint(role_ids):
+                return True
+        return False
+
+
+class DecisionCache:
+    """LRU of check results keyed by (guild id, member id, qualified command name).
+
+    Every drop bumps ``generation``, so a decision computed across one is
+    discarded instead of cached. One counter for the whole cache keeps it
+    bounded; the cost is occasionally not caching a decision that raced an
+    unrelated drop, which the next check caches instead.
+    """
+
+    def __init__(self, max_size: int = DECISION_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[int, int, str], bool]" = OrderedDict()
+        self._by_member: Dict[Tuple[int, int], Set[Tuple[int, int, str]]] = {}
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Tuple[int, int, str]) -> Optional[bool]:
+        allowed = self._entries.get(key)
+        if allowed is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return allowed
+
+    def put(
+        self, key: Tuple[int, int, str], allowed: bool, generation: Optional[int] = None
+    ):
+        """Cache a decision, unless anything was dropped since ``generation``."""
+        if generation is not None and generation != self.generation:
+            return
+        self._entries[key] = allowed
+        self._entries.move_to_end(key)
+        self._by_member.setdefault(key[:2], set()).add(key)
+        while len(self._entries) > self.max_size:
+            old, _ = self._entries.popitem(last=False)
+            self._forget(old)
+
+    def _forget(self, key: Tuple[int, int, str]):
+        keys = self._by_member.get(key[:2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_member[key[:2]]
+
+    def drop_member(self, guild_id: int, member_id: int):
+        self.generation += 1
+        for key in self._by_member.pop((guild_id, member_id), ()):
+            self._entries.pop(key, None)
+
+    def drop_guild(self, guild_id: int):
+        self.generation += 1
+        for member_key in [k for k in self._by_member if k[0] == guild_id]:
+            for key in self._by_member.pop(member_key):
+                self._entries.pop(key, None)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class NameIndex:
+    """Case-folded name -> ids for one guild's members or roles."""
+
+    def __init__(self):
+        # Dicts keep insertion order, so the first id added wins on duplicates
+        self._ids: Dict[str, Dict[int, None]] = {}
+
+    def add(self, name: str, id_: int):
+        self._ids.setdefault(name.casefold(), {})[id_] = None
+
+    def remove(self, name: str, id_: int):
+        key = name.casefold()
+        ids = self._ids.get(key)
+        if ids is not None:
+            ids.pop(id_, None)
+            if not ids:
+                del self._ids[key]
+
+    def get(self, name: str) -> Optional[int]:
+        ids = self._ids.get(name.casefold())
+        return next(iter(ids)) if ids else None
+
+    async def closest(self, name: str) -> Optional[int]:
+        """Best fuzzy match.
+
+        Runs in a thread so the loop can keep serving events between its GIL
+        slices; it is not free, which is why it only runs on a miss.
+        """
+        names = list(self._ids)
+        matches = await asyncio.to_thread(
+            difflib.get_close_matches, name.casefold(), names, 1, FUZZY_CUTOFF
+        )
+        return self.get(matches[0]) if matches else None
+
+
+def _member_names(member) -> Tuple[str, str]:
+    return member.name, f"{member.name}#{member.discriminator}"
 
 
 class CommandLockdown(commands.Cog):
@@ -23,6 +185,14 @@ class CommandLockdown(commands.Cog):
             trusted_roles={},
             trusted_users={},
         )
+        # guild id -> LockdownMatrix, compiled on first use and dropped on edits
+        self._matrices: Dict[int, LockdownMatrix] = {}
+        # guild id -> edit count, so a compile that raced an edit isn't stored
+        self._generations: Dict[int, int] = {}
+        self._decisions = DecisionCache()
+        # guild id -> NameIndex, built on first name lookup and kept up by events
+        self._member_names: Dict[int, NameIndex] = {}
+        self._role_names: Dict[int, NameIndex] = {}
 
         self._original_checks: List = []
         try:
@@ -50,43 +220,101 @@ class CommandLockdown(commands.Cog):
             except Exception:
                 pass
 
-    async def _resolve_role(self, ctx, role_input: str):
+    def _member_index(self, guild: discord.Guild) -> NameIndex:
+        index = self._member_names.get(guild.id)
+        if index is None:
+            index = self._member_names[guild.id] = NameIndex()
+            for m in guild.members:
+                for name in _member_names(m):
+                    index.add(name, m.id)
+        return index
+
+    def _role_index(self, guild: discord.Guild) -> NameIndex:
+        index = self._role_names.get(guild.id)
+        if index is None:
+            index = self._role_names[guild.id] = NameIndex()
+            for r in guild.roles:
+                index.add(r.name, r.id)
+        return index
+
+    async def _resolve_role(self, ctx, role_input: str, fuzzy: bool = True):
         if role_input.startswith("<@&") and role_input.endswith(">"):
             inner = role_input[3:-1]
             if inner.isdigit():
                 return ctx.guild.get_role(int(inner))
         if role_input.isdigit():
             return ctx.guild.get_role(int(role_input))
-        for r in ctx.guild.roles:
-            if r.name.lower() == role_input.lower():
-                return r
-        return None
+        index = self._role_index(ctx.guild)
+        role_id = index.get(role_input)
+        if role_id is None and fuzzy:
+            role_id = await index.closest(role_input)
+        return ctx.guild.get_role(role_id) if role_id is not None else None
 
-    async def _resolve_member(self, ctx, member_input: str):
+    async def _resolve_member(self, ctx, member_input: str, fuzzy: bool = True):
         if member_input.startswith("<@") and member_input.endswith(">"):
             inner = member_input.strip("<@!>")
             if inner.isdigit():
                 return ctx.guild.get_member(int(inner))
         if member_input.isdigit():
             return ctx.guild.get_member(int(member_input))
-        for m in ctx.guild.members:
-            if (
-                m.name.lower() == member_input.lower()
-                or f"{m.name.lower()}#{m.discriminator}" == member_input.lower()
-            ):
-                return m
-        return None
+        index = self._member_index(ctx.guild)
+        member_id = index.get(member_input)
+        if member_id is None and fuzzy:
+            member_id = await index.closest(member_input)
+        return ctx.guild.get_member(member_id) if member_id is not None else None
 
-    async def _is_match(self, items: List[str], ctx):
-        cog_name = ctx.cog.qualified_name.lower() if ctx.cog else None
-        cmd_name = ctx.command.qualified_name.lower() if ctx.command else None
-        full_cmd = f"{cog_name}.{cmd_name}" if cog_name and cmd_name else None
-        items_lower = {i.lower() for i in items}
-        return (cog_name and cog_name in items_lower) or (
-            full_cmd and full_cmd in items_lower
+    async def _resolve_target(self, ctx, target: str):
+        """Exact role or member match first, fuzzy matches only if neither exists.
+
+        Returns the match and whether it was fuzzy.
+        """
+        exact = await self._resolve_role(
+            ctx, target, fuzzy=False
+        ) or await self._resolve_member(ctx, target, fuzzy=False)
+        if exact:
+            return exact, False
+        closest = await self._resolve_role(ctx, target) or await self._resolve_member(
+            ctx, target
         )
+        return closest, closest is not None
+
+    async def _get_matrix(self, guild: discord.Guild) -> LockdownMatrix:
+        matrix = self._matrices.get(guild.id)
+        if matrix is None:
+            generation = self._generations.get(guild.id, 0)
+            matrix = LockdownMatrix(await self.config.guild(guild).all())
+            if self._generations.get(guild.id, 0) == generation:
+                self._matrices[guild.id] = matrix
+        return matrix
+
+    def _invalidate(self, guild: discord.Guild):
+        self._generations[guild.id] = self._generations.get(guild.id, 0) + 1
+        self._matrices.pop(guild.id, None)
+        self._decisions.drop_guild(guild.id)
 
     async def _global_lockdown_check(self, ctx):
+        if ctx.guild is None:
+            return True
+        matrix = await self._get_matrix(ctx.guild)
+        if not matrix.enabled:
+            return True
+
+        key = (
+            ctx.guild.id,
+            ctx.author.id,
+            ctx.command.qualified_name if ctx.command else "",
+        )
+        allowed = self._decisions.get(key)
+        if allowed is None:
+            generation = self._decisions.generation
+            allowed = await self._decide(ctx, matrix)
+            # Don't cache a decision made against config or roles edited in the
+            # meantime
+            if self._matrices.get(ctx.guild.id) is matrix:
+                self._decisions.put(key, allowed, generation)
+        return allowed
+
+    async def _decide(self, ctx, matrix: LockdownMatrix) -> bool:
         try:
             if await self.bot.is_owner(ctx.author):
                 return True
@@ -95,32 +323,79 @@ class CommandLockdown(commands.Cog):
                 self.bot, "owner_ids", set()
             ):
                 return True
-        if ctx.guild is None:
-            return True
 
-        data = await self.config.guild(ctx.guild).all()
-        if not data["lockdown_enabled"]:
-            return True
+        cog_name = ctx.cog.qualified_name.lower() if ctx.cog else None
+        cmd_name = ctx.command.qualified_name.lower() if ctx.command else None
+        full_cmd = f"{cog_name}.{cmd_name}" if cog_name and cmd_name else None
+        return matrix.allows(ctx.author, cog_name, full_cmd)
 
-        tr_roles, tr_users = data["trusted_roles"], data["trusted_users"]
-        user_roles = {str(r.id) for r in ctx.author.roles}
+    # ===== CACHE INVALIDATION =====
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.roles != after.roles:
+            self._decisions.drop_member(after.guild.id, after.id)
+        if _member_names(before) != _member_names(after):
+            self._rename_member(after.guild.id, before, after)
 
-        # Check user
-        if str(ctx.author.id) in tr_users:
-            info = tr_users[str(ctx.author.id)]
-            if info["access"] == "all" or await self._is_match(info["cogs"], ctx):
-                return True
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        self._decisions.drop_guild(role.guild.id)
+        index = self._role_names.get(role.guild.id)
+        if index is not None:
+            index.remove(role.name, role.id)
+
+    # ===== NAME INDEX MAINTENANCE =====
+    def _rename_member(self, guild_id: int, before, after):
+        index = self._member_names.get(guild_id)
+        if index is None:
+            return
+        for name in _member_names(before):
+            index.remove(name, before.id)
+        for name in _member_names(after):
+            index.add(name, after.id)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        index = self._member_names.get(member.guild.id)
+        if index is not None:
+            for name in _member_names(member):
+                index.add(name, member.id)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        self._decisions.drop_member(member.guild.id, member.id)
+        index = self._member_names.get(member.guild.id)
+        if index is not None:
+            for name in _member_names(member):
+                index.remove(name, member.id)
+
+    @commands.Cog.listener()
+    async def on_user_update(self, before: discord.User, after: discord.User):
+        if _member_names(before) == _member_names(after):
+            return
+        for guild_id in list(self._member_names):
+            guild = self.bot.get_guild(guild_id)
+            if guild is not None and guild.get_member(after.id) is not None:
+                self._rename_member(guild_id, before, after)
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        index = self._role_names.get(role.guild.id)
+        if index is not None:
+            index.add(role.name, role.id)
 
-        # Check roles
-        allowed_items = set()
-        allow_all = False
-        for rid, info in tr_roles.items():
-            if rid in user_roles:
-                if info["access"] == "all":
-                    allow_all = True
-                    break
-                allowed_items.update(info["cogs"])
-        return allow_all or await self._is_match(list(allowed_items), ctx)
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        index = self._role_names.get(after.guild.id)
+        if index is not None and before.name != after.name:
+            index.remove(before.name, before.id)
+            index.add(after.name, after.id)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self._member_names.pop(guild.id, None)
+        self._role_names.pop(guild.id, None)
+        self._invalidate(guild)
 
     @commands.group(name="cl", invoke_without_command=True)
     @checks.is_owner()
@@ -134,6 +409,7 @@ class CommandLockdown(commands.Cog):
         """Toggle lockdown on or off."""
         current = await self.config.guild(ctx.guild).lockdown_enabled()
         await self.config.guild(ctx.guild).lockdown_enabled.set(not current)
+        self._invalidate(ctx.guild)
         await ctx.send(f"🔒 Lockdown is now {'ON' if not current else 'OFF'}.")
 
     # ===== TRUST / UNTRUST =====
@@ -141,11 +417,15 @@ class CommandLockdown(commands.Cog):
     @checks.is_owner()
     async def trust(self, ctx, target: str, *items: str):
         """Trust a role or user for all or specific cogs/commands."""
-        obj = await self._resolve_role(ctx, target) or await self._resolve_member(
-            ctx, target
-        )
+        obj, fuzzy = await self._resolve_target(ctx, target)
         if not obj:
             return await ctx.send("❌ Role or user not found.")
+        if fuzzy:
+            # Never change trust on a guess; let the owner re-run with the match
+            return await ctx.send(
+                f"❌ No exact match for `{target}`. Did you mean **{obj}** (`{obj.id}`)? "
+                "Run the command again with that name or ID."
+            )
 
         if isinstance(obj, discord.Member):
             tu = await self.config.guild(ctx.guild).trusted_users()
@@ -169,6 +449,7 @@ class CommandLockdown(commands.Cog):
                     current["access"] = "cogs"
             tr[str(obj.id)] = current
             await self.config.guild(ctx.guild).trusted_roles.set(tr)
+        self._invalidate(ctx.guild)
 
         await ctx.send(f"✅ {obj} trusted for: {', '.join(items) if items else 'All'}")
 
@@ -176,11 +457,15 @@ class CommandLockdown(commands.Cog):
     @checks.is_owner()
     async def untrust(self, ctx, target: str, *items: str):
         """Remove trust from a role or user for specific cogs/commands."""
-        obj = await self._resolve_role(ctx, target) or await self._resolve_member(
-            ctx, target
-        )
+        obj, fuzzy = await self._resolve_target(ctx, target)
         if not obj:
             return await ctx.send("❌ Role or user not found.")
+        if fuzzy:
+            # Never change trust on a guess; let the owner re-run with the match
+            return await ctx.send(
+                f"❌ No exact match for `{target}`. Did you mean **{obj}** (`{obj.id}`)? "
+                "Run the command again with that name or ID."
+            )
 
         if isinstance(obj, discord.Member):
             tu = await self.config.guild(ctx.guild).trusted_users()
@@ -204,9 +489,21 @@ class CommandLockdown(commands.Cog):
             else:
                 tr[str(obj.id)] = current
             await self.config.guild(ctx.guild).trusted_roles.set(tr)
+        self._invalidate(ctx.guild)
 
         await ctx.send(f"✅ Removed {', '.join(items)} from {obj} trust list.")
 
+    @cl.command()
+    @checks.is_owner()
+    async def cache(self, ctx):
+        """Show how often lockdown decisions are served from the cache."""
+        stats = self._decisions.stats()
+        await ctx.send(
+            f"🗃️ Decision cache: {stats['entries']}/{stats['max_size']} entries, "
+            f"{stats['hits']} hits / {stats['misses']} misses "
+            f"({stats['hit_rate']:.1%} hit rate)."
+        )
+
     # ===== STATUS =====
     @cl.command()
     @checks.is_owner()
@@ -0,0 +1,238 @@
+"""Load-test harness for the Counting message pipeline.
+
+Drives ``Counting.on_message`` with synthetic message streams against stubbed
+Config and message objects, then reports throughput, p50/p99 latency and how
+many Config reads/writes each message cost.
+
+Run from the repository root::
+
+    python -m counting.bench
+    python -m counting.bench --messages 20000 --scenario math
+"""
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+from typing import Callable, Iterator, Optional
+
+from .counting import Counting
+
+SCENARIOS = ("correct", "math", "double", "wrong")
+
+
+# ------------------------------------------------------------------ #
+#  Stubs                                                               #
+# ------------------------------------------------------------------ #
+
+
+class _StubValue:
+    """Mimics a Config value: awaitable to read, ``.set()`` to write."""
+
+    def __init__(self, store: dict, key: str, calls: Counter):
+        self._store = store
+        self._key = key
+        self._calls = calls
+
+    def __call__(self):
+        return self._read()
+
+    async def _read(self):
+        self._calls["read"] += 1
+        return self._store[self._key]
+
+    async def set(self, value):
+        self._calls["write"] += 1
+        self._store[self._key] = value
+
+
+class _StubGroup:
+    def __init__(self, store: dict, calls: Counter):
+        self._store = store
+        self._calls = calls
+
+    def __getattr__(self, key: str) -> _StubValue:
+        if key not in self._store:
+            raise AttributeError(key)
+        return _StubValue(self._store, key, self._calls)
+
+
+class StubConfig:
+    """Just enough of ``redbot.core.Config`` for the listener's hot path."""
+
+    def __init__(self, defaults: dict):
+        self.defaults = defaults
+        self.guilds: dict[int, dict] = {}
+        self.calls: Counter = Counter()
+
+    def guild(self, guild) -> _StubGroup:
+        store = self.guilds.setdefault(guild.id, dict(self.defaults))
+        return _StubGroup(store, self.calls)
+
+
+class _StubContext:
+    valid = False
+
+
+class StubBot:
+    async def get_context(self, message):
+        return _StubContext()
+
+
+class _Obj:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class StubChannel:
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+        self.sent = 0
+
+    async def send(self, content=None, **kwargs):
+        self.sent += 1
+
+
+class StubMessage:
+    def __init__(self, content: str, author, guild, channel: StubChannel):
+        self.content = content
+        self.author = author
+        self.guild = guild
+        self.channel = channel
+
+    async def add_reaction(self, emoji):
+        pass
+
+    async def delete(self):
+        pass
+
+
+# ------------------------------------------------------------------ #
+#  Message streams                                                     #
+# ------------------------------------------------------------------ #
+
+
+def _stream(
+    scenario: str, count: int, guild, channel: StubChannel, start: int
+) -> Iterator[StubMessage]:
+    """Yield synthetic messages for ``scenario``.
+
+    ``start`` is the guild's current count; every stream except ``wrong``
+    and ``double`` keeps the chain unbroken for its whole length.
+    """
+    users = [_Obj(id=1000 + i, bot=False, display_name=f"user{i}") for i in range(8)]
+    expected = start + 1
+    for i in range(count):
+        author = users[i % len(users)]
+        if scenario == "correct":
+            content = str(expected)
+        elif scenario == "math":
+            content = f"({expected - 3}) + 6 / 2"
+        elif scenario == "double":
+            # Every other message repeats the previous author
+            author = users[(i // 2) % len(users)]
+            content = str(expected)
+        elif scenario == "wrong":
+            content = str(expected + 7)
+        else:
+            raise ValueError(f"Unknown scenario: {scenario}")
+        yield StubMessage(content, author, guild, channel)
+        if scenario in ("correct", "math"):
+            expected += 1
+        elif scenario == "double":
+            # A double count resets the chain to the start number
+            expected = expected + 1 if i % 2 == 0 else start + 1
+        else:
+            expected = start + 1
+
+
+# ------------------------------------------------------------------ #
+#  Runner                                                              #
+# ------------------------------------------------------------------ #
+
+
+def _percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def make_cog(config: Optional[StubConfig] = None) -> Counting:
+    """Build a Counting cog wired to stubs instead of a live bot."""
+    cog = Counting.__new__(Counting)
+    cog.bot = StubBot()
+    cog.config = config or StubConfig(
+        {
+            "channel_id": 1,
+            "enabled": True,
+            "current_count": 0,
+            "last_user_id": None,
+            "start_number": 0,
+            "tick_reaction": "✅",
+            "wrong_reaction": "❌",
+            "pending_reset": False,
+            "pending_reset_msg_id": None,
+        }
+    )
+    cog._pending_resets = {}
+    return cog
+
+
+async def run_scenario(
+    scenario: str, messages: int, clock: Callable[[], float] = time.perf_counter
+) -> dict:
+    """Feed ``messages`` synthetic messages through ``on_message``."""
+    cog = make_cog()
+    guild = _Obj(id=1, name="bench")
+    channel = StubChannel(1)
+    latencies = []
+
+    began = clock()
+    for message in _stream(scenario, messages, guild, channel, start=0):
+        t0 = clock()
+        await cog.on_message(message)
+        latencies.append(clock() - t0)
+    elapsed = clock() - began
+
+    calls = cog.config.calls
+    return {
+        "scenario": scenario,
+        "messages": messages,
+        "elapsed": elapsed,
+        "throughput": messages / elapsed if elapsed else float("inf"),
+        "p50_us": _percentile(latencies, 50) * 1e6,
+        "p99_us": _percentile(latencies, 99) * 1e6,
+        "reads_per_msg": calls["read"] / messages,
+        "writes_per_msg": calls["write"] / messages,
+        "channel_sends": channel.sent,
+    }
+
+
+def _format(result: dict) -> str:
+    return (
+        f"{result['scenario']:<8} {result['messages']:>7} msgs "
+        f"{result['throughput']:>10.0f} msg/s  "
+        f"p50 {result['p50_us']:>8.1f} µs  p99 {result['p99_us']:>8.1f} µs  "
+        f"config r/w per msg {result['reads_per_msg']:.2f}/{result['writes_per_msg']:.2f}  "
+        f"sends {result['channel_sends']}"
+    )
+
+
+async def _main(args: argparse.Namespace):
+    scenarios = SCENARIOS if args.scenario == "all" else (args.scenario,)
+    for scenario in scenarios:
+        result = await run_scenario(scenario, args.messages)
+        print(_format(result))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--scenario", choices=("all",) + SCENARIOS, default="all")
+    asyncio.run(_main(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,40 @@
+import asyncio
+import csv
+import heapq
+import io
+import json
+import logging
+import time
+from collections import defaultdict
+
 import discord
 from redbot.core import commands, checks, Config
 from redbot.core.bot import Red
-from typing import Optional, Dict
+from redbot.core.utils.chat_formatting import humanize_timedelta, text_to_file
+from typing import Optional, Dict, Iterator, List, Tuple
+
+log = logging.getLogger("red.ownerblacklist")
+
+# Column order of `ob export csv` files
+CSV_FIELDS = ("user_id", "scope", "target", "expires")
+
+
+class CompiledEntry:
+    """One user's blacklist for one scope, frozen for fast lookups."""
+
+    __slots__ = ("all", "cogs", "commands")
+
+    def __init__(self, entry: Dict):
+        self.all = entry.get("all", False)
+        self.cogs = frozenset(entry.get("cogs", []))
+        self.commands = frozenset(entry.get("commands", []))
+
+    def blocks(self, cog_name: Optional[str], full_cmd: Optional[str]) -> bool:
+        return (
+            self.all
+            or (cog_name is not None and cog_name in self.cogs)
+            or (full_cmd is not None and full_cmd in self.commands)
+        )
 
 
 class OwnerBlacklist(commands.Cog):
@@ -12,53 +45,180 @@ class OwnerBlacklist(commands.Cog):
         self.config = Config.get_conf(
             self, identifier=92384723984723, force_registration=True
         )
+        # Legacy single blob of every user's entries, migrated in cog_load
         self.config.register_global(blacklist={})
-        bot.add_check(self._global_blacklist_check)
+        # scope key ("all", "dm" or guild id) -> entry, stored per user
+        self.config.register_user(blacklist={})
+        # user id -> scope key -> CompiledEntry
+        self._index: Dict[int, Dict[str, CompiledEntry]] = {}
+        # (expires at, uid, scope key, target); stale items are skipped when popped
+        self._expiries: List[Tuple[float, int, str, str]] = []
+        self._expiry_wakeup = asyncio.Event()
+        self._expiry_task: Optional[asyncio.Task] = None
+
+    async def cog_load(self):
+        legacy = await self.config.blacklist()
+        if legacy:
+            for uid, scopes in legacy.items():
+                await self.config.user_from_id(int(uid)).blacklist.set(scopes)
+            await self.config.blacklist.clear()
+            log.info("Moved %d blacklisted users to per-user storage", len(legacy))
+
+        for uid, data in (await self.config.all_users()).items():
+            scopes = data.get("blacklist")
+            if not scopes:
+                continue
+            self._compile_user(uid, scopes)
+            self._schedule_user(uid, scopes)
+        self._expiry_task = asyncio.create_task(self._expiry_loop())
+        self.bot.add_check(self._global_blacklist_check)
 
     def cog_unload(self):
         try:
             self.bot.remove_check(self._global_blacklist_check)
         except Exception:
             pass
+        if self._expiry_task is not None:
+            self._expiry_task.cancel()
+
+    def _compile_user(self, uid: int, scopes: Dict):
+        """Rebuild one user's part of the lookup index from their stored entries."""
+        if scopes:
+            self._index[uid] = {
+                scope: CompiledEntry(entry) for scope, entry in scopes.items()
+            }
+        else:
+            self._index.pop(uid, None)
 
-    async def _global_blacklist_check(self, ctx: commands.Context) -> bool:
-        """Silently check if a user is blacklisted before running any command."""
-        bl_data: Dict = await self.config.blacklist()
-        uid = str(ctx.author.id)
-        if uid not in bl_data:
-            return True
+    async def _save_user(self, uid: int, scopes: Dict):
+        """Write one user's entries (clearing them if empty) and recompile them."""
+        if scopes:
+            await self.config.user_from_id(uid).blacklist.set(scopes)
+        else:
+            await self.config.user_from_id(uid).blacklist.clear()
+        self._compile_user(uid, scopes)
 
-        # Check global "all" scope first
-        if "all" in bl_data[uid]:
-            entry = bl_data[uid]["all"]
-            if entry.get("all", False):
-                return False
-            cog_name = ctx.cog.qualified_name.lower() if ctx.cog else None
-            cmd_name = ctx.command.qualified_name.lower() if ctx.command else None
-            full_cmd = f"{cog_name}.{cmd_name}" if cog_name and cmd_name else cmd_name
-            if cog_name and cog_name in set(entry.get("cogs", [])):
-                return False
-            if full_cmd and full_cmd in set(entry.get("commands", [])):
-                return False
+    @staticmethod
+    def _add_target(
+        scopes: Dict, scope_key: str, target: str, expires: Optional[float] = None
+    ):
+        """Add one target to a scope entry, creating the entry if needed."""
+        entry = scopes.setdefault(
+            scope_key, {"all": False, "cogs": [], "commands": []}
+        )
+        if target == "all":
+            entry["all"] = True
+        elif "." in target:
+            commands_set = set(entry.get("commands", []))
+            commands_set.add(target)
+            entry["commands"] = list(commands_set)
+        else:
+            cogs_set = set(entry.get("cogs", []))
+            cogs_set.add(target)
+            entry["cogs"] = list(cogs_set)
 
-        # Then check scope-specific
-        scope_key = "dm" if ctx.guild is None else str(ctx.guild.id)
-        if scope_key not in bl_data[uid]:
-            return True
+        # Re-adding without a duration makes a temporary entry permanent
+        expiries = entry.setdefault("expires", {})
+        if expires is None:
+            expiries.pop(target, None)
+        else:
+            expiries[target] = expires
 
-        entry = bl_data[uid][scope_key]
+    @staticmethod
+    def _discard_target(scopes: Dict, scope_key: str, target: str):
+        """Remove one target from a scope entry, dropping the entry once empty."""
+        entry = scopes[scope_key]
+        if target == "all":
+            entry["all"] = False
+        elif "." in target:
+            commands_set = set(entry.get("commands", []))
+            commands_set.discard(target)
+            entry["commands"] = list(commands_set)
+        else:
+            cogs_set = set(entry.get("cogs", []))
+            cogs_set.discard(target)
+            entry["cogs"] = list(cogs_set)
+        entry.get("expires", {}).pop(target, None)
+
+        if not entry["all"] and not entry["cogs"] and not entry["commands"]:
+            scopes.pop(scope_key)
+
+    # ------ #
+    # Expiry #
+    # ------ #
+
+    def _schedule_expiry(self, expires: float, uid: int, scope_key: str, target: str):
+        heapq.heappush(self._expiries, (expires, uid, scope_key, target))
+        if self._expiries[0][0] == expires:
+            self._expiry_wakeup.set()
+
+    def _schedule_user(self, uid: int, scopes: Dict):
+        for scope_key, entry in scopes.items():
+            for target, expires in entry.get("expires", {}).items():
+                self._schedule_expiry(expires, uid, scope_key, target)
+
+    async def _expiry_loop(self):
+        """Sleep until the earliest expiry, then lift everything that is due."""
+        while True:
+            self._expiry_wakeup.clear()
+            timeout = self._expiries[0][0] - time.time() if self._expiries else None
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(self._expiry_wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._expire_due()
+            except Exception:
+                log.exception("Failed to lift expired blacklist entries")
+
+    async def _expire_due(self):
+        now = time.time()
+        due = defaultdict(list)
+        while self._expiries and self._expiries[0][0] <= now:
+            expires, uid, scope_key, target = heapq.heappop(self._expiries)
+            due[uid].append((expires, scope_key, target))
+
+        lifted = 0
+        for uid, items in due.items():
+            value = self.config.user_from_id(uid).blacklist
+            async with value.get_lock():
+                scopes = await value()
+                changed = False
+                for expires, scope_key, target in items:
+                    entry = scopes.get(scope_key)
+                    # The entry was removed or re-added with another duration since
+                    if entry is None or entry.get("expires", {}).get(target) != expires:
+                        continue
+                    self._discard_target(scopes, scope_key, target)
+                    changed = True
+                    lifted += 1
+                if changed:
+                    await self._save_user(uid, scopes)
+        if lifted:
+            log.info("Lifted %d expired blacklist entries", lifted)
+
+    # ----- #
+    # Check #
+    # ----- #
 
-        if entry.get("all", False):
-            return False
+    async def _global_blacklist_check(self, ctx: commands.Context) -> bool:
+        """Silently check if a user is blacklisted before running any command."""
+        scopes = self._index.get(ctx.author.id)
+        if scopes is None:
+            return True
 
         cog_name = ctx.cog.qualified_name.lower() if ctx.cog else None
         cmd_name = ctx.command.qualified_name.lower() if ctx.command else None
         full_cmd = f"{cog_name}.{cmd_name}" if cog_name and cmd_name else cmd_name
 
-        if cog_name and cog_name in set(entry.get("cogs", [])):
-            return False
-        if full_cmd and full_cmd in set(entry.get("commands", [])):
-            return False
+        # Check global "all" scope first, then the scope-specific one
+        scope_key = "dm" if ctx.guild is None else str(ctx.guild.id)
+        for key in ("all", scope_key):
+            entry = scopes.get(key)
+            if entry is not None and entry.blocks(cog_name, full_cmd):
+                return False
 
         return True
 
@@ -78,6 +238,14 @@ class OwnerBlacklist(commands.Cog):
         """Return human-readable target name."""
         return "all commands" if target.lower() == "all" else target
 
+    @staticmethod
+    def _format_remaining(expiries: Dict, target: str) -> str:
+        """Return ' (⏳ time left)' for a temporary target, or '' if it is permanent."""
+        if target not in expiries:
+            return ""
+        remaining = max(1, int(expiries[target] - time.time()))
+        return f" (⏳ {humanize_timedelta(seconds=remaining)})"
+
     @commands.group(name="ownerblacklist", aliases=["ob"])
     @checks.is_owner()
     async def ob_group(self, ctx):
@@ -93,13 +261,28 @@ class OwnerBlacklist(commands.Cog):
         user: discord.User,
         target: Optional[str] = "all",
         scope: Optional[str] = "guild",
+        *,
+        duration: Optional[str] = None,
     ):
-        """Blacklist a user from a cog, command, or all."""
-        bl_data = await self.config.blacklist()
-        uid = str(user.id)
-        if uid not in bl_data:
-            bl_data[uid] = {}
-
+        """Blacklist a user from a cog, command, or all.
+
+        Give a duration such as `30m`, `7d` or `1 week` to lift the entry
+        automatically.
+        """
+        delta = None
+        if duration is not None:
+            # Parsed here so a typo fails loudly instead of making a permanent entry
+            try:
+                delta = commands.parse_timedelta(duration)
+            except commands.BadArgument as e:
+                await ctx.send(f"❌ Invalid duration: {e}")
+                return
+            if delta is None:
+                await ctx.send(
+                    f"❌ Could not understand the duration `{duration}`. "
+                    "Try something like `30m`, `7d` or `1 week`."
+                )
+                return
         # Determine scope
         if scope.lower() == "all":
             scope_key = "all"
@@ -116,29 +299,25 @@ class OwnerBlacklist(commands.Cog):
             await ctx.send("❌ Invalid scope. Use 'dm', 'guild', 'all', or a guild ID.")
             return
 
-        if scope_key not in bl_data[uid]:
-            bl_data[uid][scope_key] = {"all": False, "cogs": [], "commands": []}
-
-        entry = bl_data[uid][scope_key]
+        target_key = target.lower()
+        expires = time.time() + delta.total_seconds() if delta else None
 
-        if target.lower() == "all":
-            entry["all"] = True
-        elif "." in target:
-            commands_set = set(entry.get("commands", []))
-            commands_set.add(target.lower())
-            entry["commands"] = list(commands_set)
-        else:
-            cogs_set = set(entry.get("cogs", []))
-            cogs_set.add(target.lower())
-            entry["cogs"] = list(cogs_set)
+        value = self.config.user(user).blacklist
+        async with value.get_lock():
+            scopes = await value()
+            self._add_target(scopes, scope_key, target_key, expires)
+            await self._save_user(user.id, scopes)
 
-        bl_data[uid][scope_key] = entry
-        await self.config.blacklist.set(bl_data)
+        if expires is not None:
+            self._schedule_expiry(expires, user.id, scope_key, target_key)
 
         target_display = self._format_target_display(target)
+        description = f"{user.mention} — denied from using `{target_display}` {self._format_scope_name(ctx, scope_key)}"
+        if delta:
+            description += f" for {humanize_timedelta(timedelta=delta)}"
         embed = discord.Embed(
             title="✅ Blacklist Updated",
-            description=f"{user.mention} — denied from using `{target_display}` {self._format_scope_name(ctx, scope_key)}.",
+            description=description + ".",
             color=discord.Color.red(),
         )
         await ctx.send(embed=embed)
@@ -153,12 +332,6 @@ class OwnerBlacklist(commands.Cog):
         scope: Optional[str] = "guild",
     ):
         """Remove a blacklist entry for a user."""
-        bl_data = await self.config.blacklist()
-        uid = str(user.id)
-        if uid not in bl_data:
-            await ctx.send(f"❌ {user} has no Owner Blacklist entries.")
-            return
-
         if scope.lower() == "all":
             scope_key = "all"
         elif scope.lower() == "dm":
@@ -174,29 +347,19 @@ class OwnerBlacklist(commands.Cog):
             await ctx.send("❌ Invalid scope.")
             return
 
-        if scope_key not in bl_data[uid]:
-            await ctx.send(f"❌ {user} has no Owner Blacklist in that scope.")
-            return
-
-        entry = bl_data[uid][scope_key]
-        if target.lower() == "all":
-            entry["all"] = False
-        elif "." in target:
-            commands_set = set(entry.get("commands", []))
-            commands_set.discard(target.lower())
-            entry["commands"] = list(commands_set)
-        else:
-            cogs_set = set(entry.get("cogs", []))
-            cogs_set.discard(target.lower())
-            entry["cogs"] = list(cogs_set)
-
-        if not entry["all"] and not entry["cogs"] and not entry["commands"]:
-            bl_data[uid].pop(scope_key)
+        value = self.config.user(user).blacklist
+        async with value.get_lock():
+            scopes = await value()
+            if not scopes:
+                await ctx.send(f"❌ {user} has no Owner Blacklist entries.")
+                return
 
-        if not bl_data[uid]:
-            bl_data.pop(uid)
+            if scope_key not in scopes:
+                await ctx.send(f"❌ {user} has no Owner Blacklist in that scope.")
+                return
 
-        await self.config.blacklist.set(bl_data)
+            self._discard_target(scopes, scope_key, target.lower())
+            await self._save_user(user.id, scopes)
 
         target_display = self._format_target_display(target)
         embed = discord.Embed(
@@ -262,7 +425,11 @@ class OwnerBlacklist(commands.Cog):
     @checks.is_owner()
     async def ob_status(self, ctx):
         """Show all Owner Blacklists in an embed."""
-        bl_data = await self.config.blacklist()
+        bl_data = {
+            uid: data["blacklist"]
+            for uid, data in (await self.config.all_users()).items()
+            if data.get("blacklist")
+        }
         embed = discord.Embed(
             title="Owner Blacklist Status",
             description="Current Owner Blacklist configuration",
@@ -284,18 +451,137 @@ class OwnerBlacklist(commands.Cog):
                     if scope == "all"
                     else "DMs" if scope == "dm" else f"Guild {scope}"
                 )
+                expiries = entry.get("expires", {})
                 lines = [f"**Scope:** {scope_title}"]
                 if entry["all"]:
-                    lines.append("• ALL commands blocked")
+                    lines.append(
+                        "• ALL commands blocked" + self._format_remaining(expiries, "all")
+                    )
                 if entry["cogs"]:
-                    lines.append(f"• Cogs: {', '.join(entry['cogs'])}")
+                    cogs = ", ".join(
+                        cog + self._format_remaining(expiries, cog)
+                        for cog in entry["cogs"]
+                    )
+                    lines.append(f"• Cogs: {cogs}")
                 if entry["commands"]:
-                    lines.append(f"• Commands: {', '.join(entry['commands'])}")
+                    cmds = ", ".join(
+                        cmd + self._format_remaining(expiries, cmd)
+                        for cmd in entry["commands"]
+                    )
+                    lines.append(f"• Commands: {cmds}")
                 value_lines.append("\n".join(lines))
             embed.add_field(name=uname, value="\n\n".join(value_lines), inline=False)
 
         await ctx.send(embed=embed)
 
+    # ------------- #
+    # Import/Export #
+    # ------------- #
+
+    @staticmethod
+    def _rows(uid: int, scopes: Dict) -> Iterator[Dict]:
+        """Flatten one user's entries into one row per blocked target."""
+        for scope_key, entry in scopes.items():
+            expiries = entry.get("expires", {})
+            targets = ["all"] if entry["all"] else []
+            for target in targets + entry["cogs"] + entry["commands"]:
+                yield {
+                    "user_id": uid,
+                    "scope": scope_key,
+                    "target": target,
+                    "expires": expiries.get(target, ""),
+                }
+
+    @staticmethod
+    def _parse_import(filename: str, raw: str) -> List[Dict]:
+        """Read rows from a CSV export or a JSON ``{user id: scopes}`` export."""
+        if filename.lower().endswith(".csv"):
+            return list(csv.DictReader(io.StringIO(raw)))
+        return [
+            row
+            for uid, scopes in json.loads(raw).items()
+            for row in OwnerBlacklist._rows(int(uid), scopes)
+        ]
+
+    @ob_group.command(name="export")
+    @checks.is_owner()
+    async def ob_export(self, ctx, fmt: str = "json"):
+        """Export every Owner Blacklist entry as a `json` or `csv` file."""
+        fmt = fmt.lower()
+        if fmt not in ("json", "csv"):
+            await ctx.send("❌ Format must be 'json' or 'csv'.")
+            return
+
+        bl_data = {
+            str(uid): data["blacklist"]
+            for uid, data in (await self.config.all_users()).items()
+            if data.get("blacklist")
+        }
+        if fmt == "json":
+            text = json.dumps(bl_data, indent=2)
+        else:
+            out = io.StringIO()
+            writer = csv.DictWriter(out, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            for uid, scopes in bl_data.items():
+                writer.writerows(self._rows(int(uid), scopes))
+            text = out.getvalue()
+
+        await ctx.send(
+            f"✅ Exported {len(bl_data)} blacklisted users.",
+            file=text_to_file(text, filename=f"ownerblacklist.{fmt}"),
+        )
+
+    @ob_group.command(name="import")
+    @checks.is_owner()
+    async def ob_import(self, ctx):
+        """Merge entries from an attached `json` or `csv` export into the blacklist.
+
+        Entries that have already expired are skipped. Each user is written once.
+        """
+        if not ctx.message.attachments:
+            await ctx.send("❌ Attach a .json or .csv file exported with `ob export`.")
+            return
+        attachment = ctx.message.attachments[0]
+
+        try:
+            raw = (await attachment.read()).decode("utf-8-sig")
+            rows = self._parse_import(attachment.filename, raw)
+            by_user = defaultdict(list)
+            for row in rows:
+                expires = float(row["expires"]) if row.get("expires") else None
+                scope_key = str(row["scope"]).lower()
+                if scope_key not in ("all", "dm") and not scope_key.isdigit():
+                    raise ValueError(f"invalid scope {row['scope']!r}")
+                by_user[int(row["user_id"])].append(
+                    (scope_key, str(row["target"]).lower(), expires)
+                )
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            await ctx.send(f"❌ Could not read that file: {e}")
+            return
+
+        now = time.time()
+        added = 0
+        for uid, items in by_user.items():
+            value = self.config.user_from_id(uid).blacklist
+            async with value.get_lock():
+                scopes = await value()
+                for scope_key, target, expires in items:
+                    if expires is not None and expires <= now:
+                        continue
+                    self._add_target(scopes, scope_key, target, expires)
+                    if expires is not None:
+                        self._schedule_expiry(expires, uid, scope_key, target)
+                    added += 1
+                await self._save_user(uid, scopes)
+
+        embed = discord.Embed(
+            title="✅ Blacklist Imported",
+            description=f"Imported {added} entries for {len(by_user)} users.",
+            color=discord.Color.red(),
+        )
+        await ctx.send(embed=embed)
+
 
 async def setup(bot: Red):
     await bot.add_cog(OwnerBlacklist(bot))
\ No newline at end of file
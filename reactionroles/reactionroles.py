@@ -1,39 +1,90 @@
 import asyncio
 import discord
 import re
+from typing import Optional
+
 from redbot.core import commands, Config
 from redbot.core.bot import Red
 
+from .updates import EDIT_INTERVAL, RoleUpdater
+
 HEX_REGEX = re.compile(r"^#?[0-9a-fA-F]{6}$")
 
+# Dropdown panels are re-sent at most once per this many seconds to clear selections
+SELECT_RESET_DELAY = 5
+
+
+class Panel:
+    """In-memory copy of a stored panel, with lookups precomputed for events."""
+
+    __slots__ = (
+        "guild_id",
+        "message_id",
+        "mode",
+        "unique",
+        "channel_id",
+        "roles",
+        "emoji_roles",
+    )
+
+    def __init__(self, guild_id: int, message_id: int, data: dict):
+        self.guild_id = guild_id
+        self.message_id = message_id
+        self.mode = data["mode"]
+        self.unique = data.get("unique", False)
+        self.channel_id = data["channel"]
+        # role id -> {"emoji": ..., "label": ...}, in panel order
+        self.roles = {int(rid): info for rid, info in data["roles"].items()}
+        self.emoji_roles: dict[str, int] = {}
+        for rid, info in self.roles.items():
+            self.emoji_roles.setdefault(info["emoji"], rid)
+
 
 class RRView(discord.ui.View):
     def __init__(self):
         super().__init__(timeout=None)
 
 
-class RRButton(discord.ui.Button):
+class RRButton(
+    discord.ui.DynamicItem[discord.ui.Button],
+    template=r"rr_btn_(?P<guild_id>[0-9]+)_(?P<message_id>[0-9]+)_(?P<role_id>[0-9]+)",
+):
+    """Role toggle button. Registered once for every panel via its custom_id."""
+
     def __init__(
-        self, guild_id: int, message_id: int, role_id: int, label: str, emoji: str
+        self,
+        guild_id: int,
+        message_id: int,
+        role_id: int,
+        label: Optional[str] = None,
+        emoji: Optional[str] = None,
     ):
         super().__init__(
-            label=label,
-            emoji=emoji,
-            style=discord.ButtonStyle.secondary,
-            custom_id=f"rr_btn_{guild_id}_{message_id}_{role_id}",
+            discord.ui.Button(
+                label=label,
+                emoji=emoji,
+                style=discord.ButtonStyle.secondary,
+                custom_id=f"rr_btn_{guild_id}_{message_id}_{role_id}",
+            )
         )
         self.guild_id = guild_id
         self.message_id = message_id
         self.role_id = role_id
 
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(
+            int(match["guild_id"]), int(match["message_id"]), int(match["role_id"])
+        )
+
     async def callback(self, interaction: discord.Interaction):
         cog = interaction.client.get_cog("ReactionRoles")
-        panel = await cog.get_panel(self.guild_id, self.message_id)
+        panel = cog.get_panel(self.message_id)
 
         role = interaction.guild.get_role(self.role_id)
         member = interaction.user
 
-        if not role:
+        if not panel or not role:
             return await interaction.response.send_message(
                 "Role not found.", ephemeral=True
             )
@@ -43,20 +94,168 @@ class RRButton(discord.ui.Button):
                 "I cannot manage that role.", ephemeral=True
             )
 
-        await interaction.response.defer(ephemeral=True)
+        added, applied = cog.queue_panel_role(member, panel, role)
+        if added:
+            await interaction.response.send_message(
+                f"Added {role.name}", ephemeral=True
+            )
+        else:
+            await interaction.response.send_message(
+                f"Removed {role.name}", ephemeral=True
+            )
+
+        try:
+            await asyncio.shield(applied)
+        except discord.HTTPException:
+            await interaction.followup.send(
+                "I couldn't update your roles.", ephemeral=True
+            )
+
 
-        if panel.get("unique"):
-            for rid in panel["roles"]:
-                r = interaction.guild.get_role(int(rid))
-                if r and r in member.roles and r.id != role.id:
-                    await member.remove_roles(r)
+class RRSelect(
+    discord.ui.DynamicItem[discord.ui.Select],
+    template=r"rr_select_(?P<guild_id>[0-9]+)_(?P<message_id>[0-9]+)",
+):
+    """Role dropdown. Registered once for every panel via its custom_id."""
+
+    def __init__(
+        self,
+        guild_id: int,
+        message_id: int,
+        options: Optional[list[discord.SelectOption]] = None,
+    ):
+        super().__init__(
+            discord.ui.Select(
+                placeholder="Select your role",
+                options=options or [],
+                custom_id=f"rr_select_{guild_id}_{message_id}",
+            )
+        )
+        self.guild_id = guild_id
+        self.message_id = message_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match["guild_id"]), int(match["message_id"]))
+
+    async def callback(self, interaction: discord.Interaction):
+        cog = interaction.client.get_cog("ReactionRoles")
+        panel = cog.get_panel(self.message_id)
 
-        if role in member.roles:
-            await member.remove_roles(role)
-            await interaction.followup.send(f"Removed {role.name}", ephemeral=True)
+        role = interaction.guild.get_role(int(interaction.data["values"][0]))
+        member = interaction.user
+
+        if not panel or not role:
+            return await interaction.response.send_message(
+                "Role not found.", ephemeral=True
+            )
+
+        added, applied = cog.queue_panel_role(member, panel, role)
+        if added:
+            await interaction.response.send_message(
+                f"Added {role.name}", ephemeral=True
+            )
         else:
-            await member.add_roles(role)
-            await interaction.followup.send(f"Added {role.name}", ephemeral=True)
+            await interaction.response.send_message(
+                f"Removed {role.name}", ephemeral=True
+            )
+
+        try:
+            await asyncio.shield(applied)
+        except discord.HTTPException:
+            await interaction.followup.send(
+                "I couldn't update your roles.", ephemeral=True
+            )
+
+        cog.schedule_select_reset(panel)
+
+
+class RRMultiButton(
+    discord.ui.DynamicItem[discord.ui.Button],
+    template=r"rr_multi_(?P<guild_id>[0-9]+)_(?P<message_id>[0-9]+)",
+):
+    """Opens a member's own role picker for a multi-select panel."""
+
+    def __init__(self, guild_id: int, message_id: int):
+        super().__init__(
+            discord.ui.Button(
+                label="Choose your roles",
+                style=discord.ButtonStyle.primary,
+                custom_id=f"rr_multi_{guild_id}_{message_id}",
+            )
+        )
+        self.guild_id = guild_id
+        self.message_id = message_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match["guild_id"]), int(match["message_id"]))
+
+    async def callback(self, interaction: discord.Interaction):
+        cog = interaction.client.get_cog("ReactionRoles")
+        panel = cog.get_panel(self.message_id)
+        if not panel:
+            return await interaction.response.send_message(
+                "Panel not found.", ephemeral=True
+            )
+        await cog.send_role_picker(interaction, panel)
+
+
+class RolePickerView(discord.ui.View):
+    """Ephemeral multi-select showing the roles a member holds as preselected.
+
+    Only the roles the member toggles away from what was shown are changed.
+    """
+
+    def __init__(self, cog, panel: Panel, member: discord.Member):
+        super().__init__(timeout=180)
+        self.cog = cog
+        self.panel = panel
+        self.shown = {rid for rid in panel.roles if cog.updater.has_role(member, rid)}
+
+        options = [
+            discord.SelectOption(
+                label=data["label"],
+                emoji=data["emoji"],
+                value=str(rid),
+                default=rid in self.shown,
+            )
+            for rid, data in panel.roles.items()
+        ]
+        self.select = discord.ui.Select(
+            placeholder="Select your roles",
+            options=options,
+            min_values=0,
+            max_values=len(options),
+        )
+        self.select.callback = self.on_submit
+        self.add_item(self.select)
+
+    async def on_submit(self, interaction: discord.Interaction):
+        selected = {int(value) for value in self.select.values}
+        added, removed, applied = self.cog.queue_panel_selection(
+            interaction.user, self.panel, selected, self.shown
+        )
+
+        lines = []
+        if added:
+            lines.append("Added " + ", ".join(role.name for role in added))
+        if removed:
+            lines.append("Removed " + ", ".join(role.name for role in removed))
+        await interaction.response.edit_message(
+            content="\n".join(lines) or "Your roles are already up to date.",
+            view=None,
+        )
+        self.stop()
+
+        if applied is None:
+            return
+        try:
+            await asyncio.shield(applied)
+        except discord.HTTPException:
+            await interaction.followup.send(
+                "I couldn't update your roles.", ephemeral=True
+            )
 
 
 class ReactionRoles(commands.Cog):
@@ -66,25 +265,118 @@ class ReactionRoles(commands.Cog):
         self.bot = bot
         self.config = Config.get_conf(self, identifier=7788990011)
         self.config.register_guild(panels={})
+        # Minimum seconds between two role edits in one guild
+        self.config.register_global(edit_interval=EDIT_INTERVAL)
         self._active_tasks: dict[int, asyncio.Task] = {}
+        # message id -> Panel, mirrors every guild's "panels" config
+        self._panels: dict[int, Panel] = {}
+        self.updater = RoleUpdater()
+        self._select_resets: dict[int, asyncio.Task] = {}
 
     async def cog_load(self):
+        self.updater.interval = await self.config.edit_interval()
         all_data = await self.config.all_guilds()
 
         for guild_id, data in all_data.items():
             for message_id, panel in data.get("panels", {}).items():
-                if panel["mode"] in ["button", "dropdown"]:
-                    view = await self.build_view(guild_id, int(message_id), panel)
-                    self.bot.add_view(view)
+                self._index_panel(guild_id, int(message_id), panel)
+
+        # One handler per component type serves every panel's buttons and dropdowns
+        self.bot.add_dynamic_items(RRButton, RRSelect, RRMultiButton)
 
     async def cog_unload(self):
+        self.bot.remove_dynamic_items(RRButton, RRSelect, RRMultiButton)
         for task in self._active_tasks.values():
             task.cancel()
         self._active_tasks.clear()
+        for task in self._select_resets.values():
+            task.cancel()
+        self._select_resets.clear()
+        self.updater.close()
 
-    async def get_panel(self, guild_id: int, message_id: int):
-        panels = await self.config.guild_from_id(guild_id).panels()
-        return panels.get(str(message_id))
+    def get_panel(self, message_id: int):
+        return self._panels.get(message_id)
+
+    def _index_panel(self, guild_id: int, message_id: int, data: dict) -> Panel:
+        panel = Panel(guild_id, message_id, data)
+        self._panels[message_id] = panel
+        return panel
+
+    # =====================================================
+    # ROLE UPDATES
+    # =====================================================
+
+    def _panel_changes(self, member, panel: Panel, role, add=None):
+        """Role changes that give or take ``role``.
+
+        In unique mode, giving it also takes away the panel's other roles.
+        """
+        if add is None:
+            add = not self.updater.has_role(member, role.id)
+        changes = {role.id: add}
+
+        if add and panel.unique:
+            top_role = member.guild.me.top_role
+            for rid in panel.roles:
+                if rid == role.id or not self.updater.has_role(member, rid):
+                    continue
+                other = member.guild.get_role(rid)
+                if other and other < top_role:
+                    changes[rid] = False
+        return changes
+
+    async def send_role_picker(self, interaction: discord.Interaction, panel: Panel):
+        await interaction.response.send_message(
+            "Pick the roles you want from this panel.",
+            view=RolePickerView(self, panel, interaction.user),
+            ephemeral=True,
+        )
+
+    def queue_panel_role(self, member, panel: Panel, role, add=None):
+        """Queue giving, taking or (``add=None``) toggling a panel role.
+
+        Returns whether the member will end up with the role, and a future
+        that resolves once the change has been applied.
+        """
+        changes = self._panel_changes(member, panel, role, add)
+        applied = self.updater.request(member, changes, reason="Reaction role panel")
+        return changes[role.id], applied
+
+    def queue_panel_selection(
+        self, member, panel: Panel, selected: set[int], shown: set[int]
+    ):
+        """Queue the roles a member toggled in their picker, all in one edit.
+
+        ``shown`` is what the picker preselected; roles the member left as
+        shown are not touched, even if they changed elsewhere meanwhile.
+        Returns the roles added, the roles removed and a future for the edit
+        (``None`` if nothing changes).
+        """
+        top_role = member.guild.me.top_role
+        changes = {}
+        added, removed = [], []
+        for rid in panel.roles:
+            wanted = rid in selected
+            if wanted == (rid in shown):
+                continue
+            role = member.guild.get_role(rid)
+            if not role or role >= top_role:
+                continue
+            if wanted == self.updater.has_role(member, rid):
+                continue
+            changes[rid] = wanted
+            (added if wanted else removed).append(role)
+
+        if not changes:
+            return added, removed, None
+        applied = self.updater.request(member, changes, reason="Reaction role panel")
+        return added, removed, applied
+
+    async def set_panel_role(self, member, panel: Panel, role, add=None) -> bool:
+        """Like ``queue_panel_role``, but waits for the change to be applied."""
+        added, applied = self.queue_panel_role(member, panel, role, add)
+        await asyncio.shield(applied)
+        return added
 
     # =====================================================
     # REACTION LISTENERS
@@ -92,36 +384,36 @@ class ReactionRoles(commands.Cog):
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload):
+        if payload.message_id not in self._panels:
+            return
         if payload.member is None or payload.member.bot:
             return
 
-        panel = await self.get_panel(payload.guild_id, payload.message_id)
-        if not panel or panel["mode"] != "react":
+        panel = self._panels[payload.message_id]
+        if panel.mode != "react":
+            return
+
+        role_id = panel.emoji_roles.get(str(payload.emoji))
+        if role_id is None:
             return
 
         guild = self.bot.get_guild(payload.guild_id)
         member = payload.member
 
-        emoji_str = str(payload.emoji)
-
-        for rid, data in panel["roles"].items():
-            if data["emoji"] == emoji_str:
-                role = guild.get_role(int(rid))
-                if not role or role >= guild.me.top_role:
-                    return
-
-                if panel.get("unique"):
-                    for other_id in panel["roles"]:
-                        r = guild.get_role(int(other_id))
-                        if r and r in member.roles and r.id != role.id:
-                            await member.remove_roles(r)
+        role = guild.get_role(role_id)
+        if not role or role >= guild.me.top_role:
+            return
 
-                await member.add_roles(role)
+        await self.set_panel_role(member, panel, role, add=True)
 
     @commands.Cog.listener()
     async def on_raw_reaction_remove(self, payload):
-        panel = await self.get_panel(payload.guild_id, payload.message_id)
-        if not panel or panel["mode"] != "react":
+        panel = self._panels.get(payload.message_id)
+        if not panel or panel.mode != "react":
+            return
+
+        role_id = panel.emoji_roles.get(str(payload.emoji))
+        if role_id is None:
             return
 
         guild = self.bot.get_guild(payload.guild_id)
@@ -129,13 +421,9 @@ class ReactionRoles(commands.Cog):
         if not member or member.bot:
             return
 
-        emoji_str = str(payload.emoji)
-
-        for rid, data in panel["roles"].items():
-            if data["emoji"] == emoji_str:
-                role = guild.get_role(int(rid))
-                if role and role in member.roles:
-                    await member.remove_roles(role)
+        role = guild.get_role(role_id)
+        if role and self.updater.has_role(member, role.id):
+            await self.set_panel_role(member, panel, role, add=False)
 
     # =====================================================
     # GROUP
@@ -222,7 +510,7 @@ class ReactionRoles(commands.Cog):
             await ctx.send("Invalid hex. Try something like `#ff0000` or type `none`.")
 
         # Mode
-        await ctx.send("Type: button / dropdown / react")
+        await ctx.send("Type: button / dropdown / multi / react")
         while True:
             msg = await get_input()
             if msg is None:
@@ -230,25 +518,26 @@ class ReactionRoles(commands.Cog):
             if msg.content.lower() == "cancel":
                 return await ctx.send("Cancelled.")
             mode = msg.content.lower()
-            if mode in ["button", "dropdown", "react"]:
+            if mode in ["button", "dropdown", "multi", "react"]:
                 break
-            await ctx.send("Invalid mode. Choose: button / dropdown / react")
+            await ctx.send("Invalid mode. Choose: button / dropdown / multi / react")
 
-        # Unique
+        # Unique (a multi-select panel is never unique)
         unique = False
-        await ctx.send("Unique mode? (yes/no)")
-        while True:
-            msg = await get_input()
-            if msg is None:
-                return
-            if msg.content.lower() == "cancel":
-                return await ctx.send("Cancelled.")
-            if msg.content.lower() in ["yes", "y"]:
-                unique = True
-                break
-            if msg.content.lower() in ["no", "n"]:
-                break
-            await ctx.send("Please answer yes or no.")
+        if mode != "multi":
+            await ctx.send("Unique mode? (yes/no)")
+            while True:
+                msg = await get_input()
+                if msg is None:
+                    return
+                if msg.content.lower() == "cancel":
+                    return await ctx.send("Cancelled.")
+                if msg.content.lower() in ["yes", "y"]:
+                    unique = True
+                    break
+                if msg.content.lower() in ["no", "n"]:
+                    break
+                await ctx.send("Please answer yes or no.")
 
         # Roles
         roles = {}
@@ -294,13 +583,12 @@ class ReactionRoles(commands.Cog):
             for data in roles.values():
                 await message.add_reaction(data["emoji"])
 
-        if mode in ["button", "dropdown"]:
-            view = await self.build_view(ctx.guild.id, message.id, panel_data)
-            await message.edit(view=view)
-            self.bot.add_view(view)
-
         async with self.config.guild(ctx.guild).panels() as panels:
             panels[str(message.id)] = panel_data
+        panel = self._index_panel(ctx.guild.id, message.id, panel_data)
+
+        if mode in ["button", "dropdown", "multi"]:
+            await message.edit(view=self.build_view(panel))
 
         await ctx.message.add_reaction("✅")
 
@@ -308,68 +596,89 @@ class ReactionRoles(commands.Cog):
     # BUILD VIEW
     # =====================================================
 
-    async def build_view(self, guild_id: int, message_id: int, panel):
+    def build_view(self, panel: Panel):
         view = RRView()
 
-        if panel["mode"] == "button":
-            for rid, data in panel["roles"].items():
+        if panel.mode == "button":
+            for rid, data in panel.roles.items():
                 view.add_item(
                     RRButton(
-                        guild_id,
-                        message_id,
-                        int(rid),
+                        panel.guild_id,
+                        panel.message_id,
+                        rid,
                         data["label"],
                         data["emoji"],
                     )
                 )
 
-        elif panel["mode"] == "dropdown":
+        elif panel.mode == "dropdown":
             options = [
                 discord.SelectOption(
                     label=data["label"],
                     emoji=data["emoji"],
-                    value=rid,
+                    value=str(rid),
                 )
-                for rid, data in panel["roles"].items()
+                for rid, data in panel.roles.items()
             ]
+            view.add_item(RRSelect(panel.guild_id, panel.message_id, options))
 
-            select = discord.ui.Select(
-                placeholder="Select your role",
-                options=options,
-                custom_id=f"rr_select_{guild_id}_{message_id}",
-            )
+        elif panel.mode == "multi":
+            # Each member gets their own picker, preselected with their roles
+            view.add_item(RRMultiButton(panel.guild_id, panel.message_id))
 
-            async def callback(interaction: discord.Interaction):
-                role_id = int(interaction.data["values"][0])
-                role = interaction.guild.get_role(role_id)
-                member = interaction.user
+        return view
 
-                await interaction.response.defer(ephemeral=True)
+    def schedule_select_reset(self, panel: Panel):
+        """Clear a dropdown's selection with one message edit per burst of clicks.
 
-                if panel.get("unique"):
-                    for rid in panel["roles"]:
-                        r = interaction.guild.get_role(int(rid))
-                        if r and r in member.roles and r.id != role_id:
-                            await member.remove_roles(r)
+        The select keeps showing the last choice until the message is edited,
+        which stops members picking the same role again to remove it.
+        """
+        if panel.message_id not in self._select_resets:
+            self._select_resets[panel.message_id] = asyncio.create_task(
+                self._reset_select(panel)
+            )
 
-                if role in member.roles:
-                    await member.remove_roles(role)
-                    await interaction.followup.send(
-                        f"Removed {role.name}", ephemeral=True
-                    )
-                else:
-                    await member.add_roles(role)
-                    await interaction.followup.send(
-                        f"Added {role.name}", ephemeral=True
-                    )
+    async def _reset_select(self, panel: Panel):
+        try:
+            await asyncio.sleep(SELECT_RESET_DELAY)
+            channel = self.bot.get_channel(panel.channel_id)
+            if channel is None or self._panels.get(panel.message_id) is not panel:
+                return
+            message = channel.get_partial_message(panel.message_id)
+            await message.edit(view=self.build_view(panel))
+        except discord.HTTPException:
+            pass
+        finally:
+            self._select_resets.pop(panel.message_id, None)
 
-                new_view = await self.build_view(guild_id, message_id, panel)
-                await interaction.message.edit(view=new_view)
+    # =====================================================
+    # QUEUE
+    # =====================================================
 
-            select.callback = callback
-            view.add_item(select)
+    @rr.command()
+    @commands.is_owner()
+    async def queue(self, ctx):
+        """Show the role update queue and how long clicks wait to be applied."""
+        stats = self.updater.stats()
+        await ctx.send(
+            f"Pending: {stats['depth']} member(s) in {stats['guilds']} guild(s)\n"
+            f"Applied: {stats['applied']} | Merged clicks: {stats['coalesced']}"
+            f" | Failed: {stats['failed']}\n"
+            f"Latency: avg {stats['avg_latency']:.2f}s | max {stats['max_latency']:.2f}s"
+            f" | oldest pending {stats['oldest_pending']:.2f}s\n"
+            f"Pace: one edit per {self.updater.interval:g}s per guild"
+        )
 
-        return view
+    @rr.command()
+    @commands.is_owner()
+    async def pace(self, ctx, seconds: float):
+        """Set the minimum gap between two role edits in the same server."""
+        if not 0 <= seconds <= 5:
+            return await ctx.send("Interval must be between 0 and 5 seconds.")
+        await self.config.edit_interval.set(seconds)
+        self.updater.interval = seconds
+        await ctx.send(f"Role edits now go out at most once per {seconds:g}s per server.")
 
     # =====================================================
     # LIST
@@ -414,5 +723,6 @@ class ReactionRoles(commands.Cog):
                     return await ctx.send("I cannot delete that message.")
 
             del panels[str(message_id)]
+        self._panels.pop(message_id, None)
 
         await ctx.send("Panel deleted and message removed.")
@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Optional
+
+import discord
+
+log = logging.getLogger("red.reactionroles.updates")
+
+# How long a member's first click waits for more clicks before it is sent
+COALESCE_DELAY = 0.5
+# Minimum gap between two member edits in the same guild
+EDIT_INTERVAL = 0.25
+# Samples kept for latency stats
+WINDOW = 200
+# How long the member returned by an edit may stand in for a lagging cache
+LAST_EDIT_TTL = 30
+
+
+class PendingUpdate:
+    """Role changes for one member that have not been sent yet.
+
+    ``changes`` maps role id -> whether the member should end up with it;
+    later clicks overwrite earlier ones so only the final state is sent.
+    """
+
+    __slots__ = ("member", "changes", "reason", "enqueued_at", "done")
+
+    def __init__(self, member: discord.Member, reason: Optional[str]):
+        self.member = member
+        self.changes: dict[int, bool] = {}
+        self.reason = reason
+        self.enqueued_at = time.monotonic()
+        self.done: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class LastEdit:
+    """The result of a member's previous edit, for building the next one.
+
+    ``before`` is the member's role ids in the cache when that edit was sent;
+    while the cache still shows them, the gateway has not caught up and
+    ``member`` (returned by the edit) is the fresher state.
+    """
+
+    __slots__ = ("before", "member", "at")
+
+    def __init__(self, before: frozenset, member: discord.Member):
+        self.before = before
+        self.member = member
+        self.at = time.monotonic()
+
+
+class RoleUpdater:
+    """Per-guild queue that applies each member's role changes in one edit.
+
+    Every guild gets a single worker that sends edits one after another, at
+    most one per ``interval`` seconds, so a burst of clicks on a new panel is
+    paced instead of piling concurrent requests onto the guild's member-edit
+    rate limit (discord.py still waits out the bucket if it runs dry). A
+    member who clicks again while their update is queued has the new click
+    merged into it, so each member costs at most one edit per pass.
+    """
+
+    def __init__(
+        self, delay: float = COALESCE_DELAY, interval: float = EDIT_INTERVAL
+    ):
+        self.delay = delay
+        self.interval = interval
+        self._pending: dict[tuple[int, int], PendingUpdate] = {}
+        self._inflight: dict[tuple[int, int], PendingUpdate] = {}
+        self._queues: dict[int, deque[int]] = {}
+        self._workers: dict[int, asyncio.Task] = {}
+        self._latencies: deque[float] = deque(maxlen=WINDOW)
+        self._last_edits: dict[tuple[int, int], LastEdit] = {}
+        self.applied = 0
+        self.coalesced = 0
+        self.failed = 0
+
+    @staticmethod
+    def _key(member: discord.Member) -> tuple[int, int]:
+        return member.guild.id, member.id
+
+    # ── Introspection ──
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> dict:
+        latencies = list(self._latencies)
+        now = time.monotonic()
+        return {
+            "depth": self.depth,
+            "guilds": len(self._workers),
+            "applied": self.applied,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+            "avg_latency": sum(latencies) / len(latencies) if latencies else 0.0,
+            "max_latency": max(latencies, default=0.0),
+            "oldest_pending": max(
+                (now - u.enqueued_at for u in self._pending.values()), default=0.0
+            ),
+        }
+
+    def has_role(self, member: discord.Member, role_id: int) -> bool:
+        """Whether the member will have the role once queued changes are applied."""
+        key = self._key(member)
+        for updates in (self._pending, self._inflight):
+            update = updates.get(key)
+            if update is not None and role_id in update.changes:
+                return update.changes[role_id]
+        return member.get_role(role_id) is not None
+
+    # ── Scheduling ──
+
+    def request(
+        self,
+        member: discord.Member,
+        changes: dict[int, bool],
+        reason: Optional[str] = None,
+    ) -> asyncio.Future:
+        """Queue role changes; the returned future resolves once they are applied."""
+        key = self._key(member)
+        update = self._pending.get(key)
+        if update is None:
+            update = self._pending[key] = PendingUpdate(member, reason)
+            self._queues.setdefault(member.guild.id, deque()).append(member.id)
+            if member.guild.id not in self._workers:
+                self._workers[member.guild.id] = asyncio.create_task(
+                    self._work(member.guild.id)
+                )
+        else:
+            self.coalesced += 1
+        update.member = member
+        update.changes.update(changes)
+        return update.done
+
+    async def _work(self, guild_id: int):
+        queue = self._queues[guild_id]
+        try:
+            while queue:
+                key = (guild_id, queue[0])
+                update = self._pending[key]
+                wait = update.enqueued_at + self.delay - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+                queue.popleft()
+                del self._pending[key]
+                self._inflight[key] = update
+                try:
+                    await self._apply(update)
+                except Exception as e:
+                    self.failed += 1
+                    if not update.done.done():
+                        update.done.set_exception(e)
+                else:
+                    self.applied += 1
+                    self._latencies.append(time.monotonic() - update.enqueued_at)
+                    if not update.done.done():
+                        update.done.set_result(None)
+                finally:
+                    self._inflight.pop(key, None)
+
+                if queue:
+                    await asyncio.sleep(self.interval)
+        finally:
+            self._workers.pop(guild_id, None)
+            if not queue:
+                self._queues.pop(guild_id, None)
+            cutoff = time.monotonic() - LAST_EDIT_TTL
+            for key in [
+                k
+                for k, last in self._last_edits.items()
+                if k[0] == guild_id and last.at < cutoff
+            ]:
+                del self._last_edits[key]
+
+    def _current_member(self, update: PendingUpdate) -> Optional[discord.Member]:
+        """The member's latest known state, rather than the copy taken at click time."""
+        key = self._key(update.member)
+        cached = update.member.guild.get_member(update.member.id)
+        last = self._last_edits.get(key)
+        if last is None or time.monotonic() - last.at > LAST_EDIT_TTL:
+            return cached
+        if cached is not None and frozenset(r.id for r in cached.roles) != last.before:
+            # The cache has moved on since our last edit, so it is newer
+            del self._last_edits[key]
+            return cached
+        return last.member
+
+    async def _apply(self, update: PendingUpdate):
+        member = self._current_member(update)
+        if member is None:
+            return  # Left the guild while queued
+        current = {role.id: role for role in member.roles if not role.is_default()}
+        target = dict(current)
+        for role_id, wanted in update.changes.items():
+            if not wanted:
+                target.pop(role_id, None)
+            elif role_id not in target:
+                role = member.guild.get_role(role_id)
+                if role is not None:
+                    target[role_id] = role
+
+        if target.keys() == current.keys():
+            return
+        cached = member.guild.get_member(member.id)
+        before = frozenset(r.id for r in (cached or member).roles)
+        edited = await member.edit(roles=list(target.values()), reason=update.reason)
+        if edited is not None:
+            self._last_edits[self._key(member)] = LastEdit(before, edited)
+
+    def close(self):
+        """Cancel every worker and drop queued updates."""
+        for task in self._workers.values():
+            task.cancel()
+        for updates in (self._pending, self._inflight):
+            for update in updates.values():
+                update.done.cancel()
+        self._workers.clear()
+        self._queues.clear()
+        self._pending.clear()
+        self._inflight.clear()
+        self._last_edits.clear()